@@ -13,6 +13,10 @@ from pathlib import Path
 from datetime import datetime
 import threading
 
+# 直接导入分析模块，避免每次点击都冷启动一个新的Python解释器
+from generate_offline_report import generate_offline_html_report
+from funnel_analyzer import FunnelAnalyzer
+
 
 class FunnelAnalyzerGUI:
     """数据分析工具图形界面"""
@@ -291,82 +295,81 @@ class FunnelAnalyzerGUI:
         thread.daemon = True
         thread.start()
 
+    def _ui(self, fn, *args):
+        """把界面更新调度回主线程执行
+
+        Tk不是线程安全的，在后台线程直接调 status_var.set/progress/messagebox
+        偶发卡死Tcl解释器；root.after 把调用排进主线程的事件循环。
+        """
+        self.root.after(0, lambda: fn(*args))
+
     def _generate_report_thread(self, file_path):
         """在后台线程中生成报告"""
         try:
             # 显示进度
-            self.progress.start()
-            self.status_var.set("正在分析数据，请稍候...")
+            self._ui(self.progress.start)
+            self._ui(self.status_var.set, "正在分析数据，请稍候...")
 
             threshold = self.threshold_var.get()
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
             generated_files = []
 
-            # 生成HTML报告
+            # 生成HTML报告（直接调用函数，省去子进程启动和pandas重复导入的开销）
             if self.html_var.get():
-                self.status_var.set("正在生成HTML可视化报告...")
+                self._ui(self.status_var.set, "正在生成HTML可视化报告...")
                 html_output = self.script_dir / f"report_offline_{timestamp}.html"
 
-                result = subprocess.run(
-                    [
-                        "python3",
-                        str(self.script_dir / "generate_offline_report.py"),
+                try:
+                    generate_offline_html_report(
                         file_path,
-                        str(html_output)
-                    ],
-                    capture_output=True,
-                    text=True
-                )
-
-                if result.returncode == 0:
+                        str(html_output),
+                        min_click_threshold=threshold
+                    )
                     generated_files.append(("HTML报告", html_output))
+                except Exception as e:
+                    self._ui(messagebox.showerror, "错误", f"HTML报告生成失败：{str(e)}")
 
             # 生成Markdown报告
             if self.md_var.get():
-                self.status_var.set("正在生成Markdown文本报告...")
+                self._ui(self.status_var.set, "正在生成Markdown文本报告...")
                 md_output = self.script_dir / f"report_{timestamp}.md"
 
-                result = subprocess.run(
-                    [
-                        "python3",
-                        str(self.script_dir / "funnel_analyzer.py"),
-                        file_path,
-                        "-o", str(md_output),
-                        "--min-click", str(threshold)
-                    ],
-                    capture_output=True,
-                    text=True
-                )
-
-                if result.returncode == 0:
-                    generated_files.append(("Markdown报告", md_output))
-
-            # 停止进度条
-            self.progress.stop()
-
-            if generated_files:
-                # 显示成功消息
-                self.status_var.set("✅ 报告生成完成！")
-
-                # 构建消息
-                msg = "分析报告已生成：\n\n"
-                for name, path in generated_files:
-                    msg += f"• {name}: {path.name}\n"
-                msg += "\n是否立即打开报告？"
-
-                if messagebox.askyesno("成功", msg):
-                    # 打开第一个报告
-                    subprocess.run(["open", str(generated_files[0][1])])
+                try:
+                    analyzer = FunnelAnalyzer(file_path, min_click_threshold=threshold)
+                    if analyzer.run_analysis(str(md_output)):
+                        generated_files.append(("Markdown报告", md_output))
+                except Exception as e:
+                    self._ui(messagebox.showerror, "错误", f"Markdown报告生成失败：{str(e)}")
 
-            else:
-                self.status_var.set("❌ 生成失败")
-                messagebox.showerror("错误", "报告生成失败，请检查数据格式是否正确。")
+            # 停止进度条并在主线程上收尾（askyesno必须在主线程弹出）
+            self._ui(self.progress.stop)
+            self._ui(self._report_finished, generated_files)
 
         except Exception as e:
-            self.progress.stop()
-            self.status_var.set("❌ 发生错误")
-            messagebox.showerror("错误", f"发生错误：{str(e)}")
+            self._ui(self.progress.stop)
+            self._ui(self.status_var.set, "❌ 发生错误")
+            self._ui(messagebox.showerror, "错误", f"发生错误：{str(e)}")
+
+    def _report_finished(self, generated_files):
+        """报告生成结束后的界面收尾（在主线程执行）"""
+        if generated_files:
+            # 显示成功消息
+            self.status_var.set("✅ 报告生成完成！")
+
+            # 构建消息
+            msg = "分析报告已生成：\n\n"
+            for name, path in generated_files:
+                msg += f"• {name}: {path.name}\n"
+            msg += "\n是否立即打开报告？"
+
+            if messagebox.askyesno("成功", msg):
+                # 打开第一个报告
+                subprocess.run(["open", str(generated_files[0][1])])
+
+        else:
+            self.status_var.set("❌ 生成失败")
+            messagebox.showerror("错误", "报告生成失败，请检查数据格式是否正确。")
 
 
 def main():
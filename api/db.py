@@ -5,33 +5,57 @@ PostgreSQL 数据库工具模块
 """
 
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import json
+import psycopg
+from psycopg.rows import dict_row
+from psycopg.types.json import set_json_loads
+from psycopg_pool import ConnectionPool
+import orjson
+import threading
+import zstandard
 from contextlib import contextmanager
 
 # 从环境变量获取数据库连接
 DATABASE_URL = os.environ.get('DATABASE_URL') or os.environ.get('POSTGRES_URL')
 
+# JSONB 读取也走 orjson（比标准库 json 快 3-5 倍）
+set_json_loads(orjson.loads)
+
+# 连接池：每次新建连接都要付一次 TCP+TLS 握手和认证（几十毫秒），
+# 池化后同一实例内的请求复用连接。惰性创建，冷启动不预先建连（min_size=0）
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """获取（按需创建）全局连接池"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    conninfo=DATABASE_URL,
+                    min_size=0,
+                    max_size=10,
+                    kwargs={'row_factory': dict_row}
+                )
+    return _pool
+
+
 @contextmanager
 def get_db_connection():
-    """获取数据库连接（上下文管理器）"""
-    conn = None
-    try:
-        conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    """获取数据库连接（上下文管理器，底层复用连接池）"""
+    pool = _get_pool()
+    # pool.connection() 在正常退出时 commit、异常时 rollback
+    with pool.connection() as conn:
         yield conn
-        conn.commit()
-    except Exception as e:
-        if conn:
-            conn.rollback()
-        raise e
-    finally:
-        if conn:
-            conn.close()
 
 
 def save_upload(filename, file_data, file_size):
-    """保存上传的文件到数据库"""
+    """保存上传的文件到数据库
+
+    bytes 参数 psycopg3 本就按二进制协议绑定，BYTEA 不会被 hex 编码；
+    binary=True 控制的是结果的返回格式，让 RETURNING 的列也走二进制。
+    """
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
@@ -40,14 +64,26 @@ def save_upload(filename, file_data, file_size):
                 VALUES (%s, %s, %s)
                 RETURNING id
                 """,
-                (filename, file_data, file_size)
+                (filename, file_data, file_size),
+                binary=True
             )
             result = cur.fetchone()
             return result['id']
 
 
+def get_upload_meta(upload_id):
+    """获取上传文件的元信息（不含 file_data，避免把多MB的大字段拉过网络）"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, filename, file_size, created_at FROM uploads WHERE id = %s",
+                (upload_id,)
+            )
+            return cur.fetchone()
+
+
 def get_upload(upload_id):
-    """获取上传的文件"""
+    """获取上传的文件（含完整 file_data，只在确实需要文件内容时使用）"""
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
@@ -57,24 +93,69 @@ def get_upload(upload_id):
             return cur.fetchone()
 
 
+def _compress_report(report_html):
+    """压缩报告HTML（内联CSS的HTML用zstd通常可压缩约10倍）"""
+    cctx = zstandard.ZstdCompressor(level=10)
+    return cctx.compress(report_html.encode('utf-8'))
+
+
+def _decode_report(report):
+    """把数据库行中的压缩报告还原成 report_html 文本"""
+    if report and report.get('report_encoding') == 'zstd' and report.get('report_data') is not None:
+        dctx = zstandard.ZstdDecompressor()
+        report['report_html'] = dctx.decompress(bytes(report['report_data'])).decode('utf-8')
+    return report
+
+
 def save_report(upload_id, report_html, data_info):
-    """保存分析报告到数据库"""
+    """保存分析报告到数据库（压缩存储）"""
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                INSERT INTO reports (upload_id, report_html, data_info)
-                VALUES (%s, %s, %s)
+                INSERT INTO reports (upload_id, report_data, report_encoding, data_info)
+                VALUES (%s, %s, 'zstd', %s)
                 RETURNING id
                 """,
-                (upload_id, report_html, json.dumps(data_info))
+                (upload_id, _compress_report(report_html), orjson.dumps(data_info).decode()),
+                binary=True
             )
             result = cur.fetchone()
             return result['id']
 
 
-def get_report(report_id):
-    """获取报告"""
+def save_upload_and_report(filename, file_data, file_size, report_html, data_info):
+    """一次往返同时保存上传文件和分析报告
+
+    /upload 原本按 save_upload、save_report 串行执行两次 INSERT，
+    各付一次网络往返。reports 的 INSERT 依赖 uploads 的自增 id，
+    用 CTE 把两条 INSERT 合成一条语句，单次往返完成。
+
+    Returns:
+        (upload_id, report_id)
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                WITH u AS (
+                    INSERT INTO uploads (filename, file_data, file_size)
+                    VALUES (%s, %s, %s)
+                    RETURNING id
+                )
+                INSERT INTO reports (upload_id, report_data, report_encoding, data_info)
+                SELECT u.id, %s, 'zstd', %s FROM u
+                RETURNING upload_id, id
+                """,
+                (filename, file_data, file_size, _compress_report(report_html), orjson.dumps(data_info).decode()),
+                binary=True
+            )
+            result = cur.fetchone()
+            return result['upload_id'], result['id']
+
+
+def get_report_row(report_id):
+    """获取报告原始行（不解压，供调用方流式解压输出）"""
     with get_db_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
@@ -84,6 +165,11 @@ def get_report(report_id):
             return cur.fetchone()
 
 
+def get_report(report_id):
+    """获取报告（自动解压压缩存储的行，旧的明文行原样返回）"""
+    return _decode_report(get_report_row(report_id))
+
+
 def list_reports(limit=50):
     """列出最近的报告"""
     with get_db_connection() as conn:
@@ -117,17 +203,33 @@ def init_database():
                 )
             """)
 
-            # 创建 reports 表
+            # 创建 reports 表（报告压缩存入 report_data，report_html 仅兼容旧行）
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS reports (
                     id SERIAL PRIMARY KEY,
                     upload_id INTEGER REFERENCES uploads(id) ON DELETE CASCADE,
-                    report_html TEXT NOT NULL,
+                    report_html TEXT,
+                    report_data BYTEA,
+                    report_encoding VARCHAR(8) DEFAULT 'plain',
                     data_info JSONB,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
 
+            # 已有部署的迁移：补充压缩列并放开旧明文列的 NOT NULL
+            cur.execute("""
+                ALTER TABLE reports
+                ADD COLUMN IF NOT EXISTS report_data BYTEA
+            """)
+            cur.execute("""
+                ALTER TABLE reports
+                ADD COLUMN IF NOT EXISTS report_encoding VARCHAR(8) DEFAULT 'plain'
+            """)
+            cur.execute("""
+                ALTER TABLE reports
+                ALTER COLUMN report_html DROP NOT NULL
+            """)
+
             # 创建索引
             cur.execute("""
                 CREATE INDEX IF NOT EXISTS idx_uploads_created_at
@@ -141,3 +243,9 @@ def init_database():
                 CREATE INDEX IF NOT EXISTS idx_reports_upload_id
                 ON reports(upload_id)
             """)
+            # 覆盖索引：list_reports 的 JOIN 只要 filename/file_size，
+            # INCLUDE 后仅凭索引即可回答，无需回表读含大 BYTEA 的堆行
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_uploads_id_filename
+                ON uploads(id) INCLUDE (filename, file_size)
+            """)
@@ -5,13 +5,17 @@
 使用 PostgreSQL 存储数据
 """
 
-from flask import Flask, render_template, request, jsonify, make_response
+from flask import Flask, render_template, request, jsonify, Response
+from flask_compress import Compress
+import hashlib
+import zstandard
 import os
 import sys
+import threading
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
 from io import BytesIO
+from cachetools import LRUCache
 import traceback
 
 # 添加父目录到路径
@@ -21,12 +25,45 @@ sys.path.insert(0, str(parent_dir))
 
 # 尝试导入数据库工具
 try:
-    from api.db import save_upload, get_upload, save_report, get_report, list_reports, init_database
+    from api.db import (save_upload, get_upload, save_report, save_upload_and_report,
+                        get_report, get_report_row, list_reports, init_database)
     DB_AVAILABLE = True
 except Exception as e:
     print(f"警告: 数据库模块导入失败: {e}")
     DB_AVAILABLE = False
 
+# pandas/numpy/polars 只有 /upload 的分析路径用到，却要占冷启动几百毫秒。
+# 延迟到首次分析时再导入，/health、/reports、/report/<id> 等端点完全不付这笔钱
+_pd = None
+_np = None
+_pl = None
+_pl_checked = False
+
+
+def _pandas():
+    """延迟导入 pandas（numpy 随之加载），只在分析请求里触发"""
+    global _pd, _np
+    if _pd is None:
+        import numpy
+        import pandas
+        _np, _pd = numpy, pandas
+    return _pd
+
+
+def _polars():
+    """延迟导入 polars：CSV 解析多线程、xlsx 走 Rust 的 calamine 解析器，
+    都远快于 pandas 默认的单线程/openpyxl 路径；不可用时返回 None 回退 pandas
+    """
+    global _pl, _pl_checked
+    if not _pl_checked:
+        _pl_checked = True
+        try:
+            import polars
+            _pl = polars
+        except Exception as e:
+            print(f"警告: polars 不可用，回退到 pandas 读取: {e}")
+    return _pl
+
 # Flask 应用配置
 template_folder = parent_dir / 'templates'
 static_folder = parent_dir / 'static'
@@ -40,6 +77,16 @@ app = Flask(__name__,
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB
 
+# 模板只在首次使用时编译一次，serverless 环境不需要热重载
+app.jinja_env.auto_reload = False
+
+# 响应压缩：报告HTML里大量重复的标签/CSS/表格行，br/gzip 可压缩5-10倍，
+# /download 带 attachment 头时边缘节点往往不压缩，这里在应用层直接压好
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_LEVEL'] = 6
+Compress(app)
+
 # 检查环境变量
 DATABASE_URL = os.environ.get('DATABASE_URL') or os.environ.get('POSTGRES_URL')
 if not DATABASE_URL:
@@ -47,29 +94,135 @@ if not DATABASE_URL:
 else:
     print(f"数据库连接已配置: {DATABASE_URL[:30]}...")
 
-ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
+ALLOWED_EXTENSIONS = frozenset(('xlsx', 'xls', 'csv'))
+
+# 报告写入后不可变，进程内LRU缓存让重复查看免掉一次Postgres往返
+_REPORT_CACHE = LRUCache(maxsize=128)
+_REPORT_CACHE_LOCK = threading.Lock()
+
+
+def cached_get_report(report_id):
+    """读取报告原始行，命中进程内缓存时跳过数据库查询
+
+    缓存的是未解压的行，内存占用约为明文的1/10；输出时按块解压。
+    """
+    with _REPORT_CACHE_LOCK:
+        report = _REPORT_CACHE.get(report_id)
+    if report is not None:
+        return report
+    report = get_report_row(report_id)
+    if report is not None:
+        with _REPORT_CACHE_LOCK:
+            _REPORT_CACHE[report_id] = report
+    return report
+
+
+# 流式输出的块大小：worker 常驻内存从整份HTML降到一个固定块
+_STREAM_CHUNK = 64 * 1024
+
+
+def _iter_report_html(report):
+    """按块产出报告HTML字节，避免在响应前物化整个文档"""
+    if report.get('report_encoding') == 'zstd' and report.get('report_data') is not None:
+        dctx = zstandard.ZstdDecompressor()
+        yield from dctx.read_to_iter(BytesIO(bytes(report['report_data'])),
+                                     write_size=_STREAM_CHUNK)
+    else:
+        html = report['report_html'].encode('utf-8')
+        for i in range(0, len(html), _STREAM_CHUNK):
+            yield html[i:i + _STREAM_CHUNK]
+
+# 分析结果对 (文件内容, 文件名, 阈值) 是确定的；迭代分析时反复上传同一份
+# 文件很常见，按内容哈希缓存可以让重复上传完全跳过解析和聚合
+_ANALYSIS_CACHE = LRUCache(maxsize=32)
+_ANALYSIS_CACHE_LOCK = threading.Lock()
+
+
+def _hash_stream(stream):
+    """分块计算上传流的哈希，整个文件不在内存里额外物化一份
+
+    BLAKE2b 对大文件比 SHA-256 快约3倍。读完后把流倒回起点。
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: stream.read(_STREAM_CHUNK), b''):
+        h.update(chunk)
+    stream.seek(0)
+    return h.digest()
+
+
+def analyze_data_cached(file_stream, filename, min_click_threshold=10):
+    """analyze_data_from_bytes 的去重缓存包装，重复上传直接复用结果"""
+    digest = _hash_stream(file_stream)
+    key = (digest, filename, min_click_threshold)
+    with _ANALYSIS_CACHE_LOCK:
+        cached = _ANALYSIS_CACHE.get(key)
+    if cached is not None:
+        return cached
+    result = analyze_data_from_bytes(file_stream, filename, min_click_threshold)
+    with _ANALYSIS_CACHE_LOCK:
+        _ANALYSIS_CACHE[key] = result
+    return result
+
+
+# 分析只用到这几列，读取时做列裁剪，跳过无关列的解析和物化
+NEEDED_COLS = ['点击事件名称', '页面UV(SUM)', '点击UV(SUM)', '点击用户提交单(SUM)', '点击用户预订单(SUM)']
+
 
 def allowed_file(filename):
-    """检查文件扩展名是否允许"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    """检查文件扩展名是否允许（rfind不像rsplit那样分配列表）"""
+    i = filename.rfind('.')
+    return i != -1 and filename[i + 1:].lower() in ALLOWED_EXTENSIONS
 
 
-def analyze_data_from_bytes(file_data, filename, min_click_threshold=10):
-    """从字节数据分析并生成报告"""
-    # 读取数据
-    file_ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+def read_dataframe_from_bytes(source, file_ext):
+    """读取 DataFrame，优先走 polars 快速解析路径
 
+    Args:
+        source: bytes 或可 seek 的二进制文件对象（如 werkzeug 的上传流）
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    pl = _polars()
     if file_ext in ['xlsx', 'xls']:
-        df = pd.read_excel(BytesIO(file_data))
+        if pl is not None:
+            return pl.read_excel(
+                source,
+                engine='calamine',
+                read_options={'use_columns': NEEDED_COLS}
+            ).to_pandas()
+        return _pandas().read_excel(source)
     elif file_ext == 'csv':
-        df = pd.read_csv(BytesIO(file_data))
+        if pl is not None:
+            return pl.read_csv(source, columns=NEEDED_COLS).to_pandas()
+        return _pandas().read_csv(source)
     else:
         raise ValueError("不支持的文件格式")
 
-    # 数据清洗
+
+def analyze_data_from_bytes(source, filename, min_click_threshold=10):
+    """从上传数据（bytes 或文件流）分析并生成报告"""
+    pd = _pandas()
+    np = _np
+
+    # 读取数据
+    file_ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+    df = read_dataframe_from_bytes(source, file_ext)
+
+    # UV计数列从默认的int64降到无符号小位宽（计数远小于2^31），
+    # 过滤、求和、分组这些带宽瓶颈的步骤要搬的字节数直接减半。
+    # 缺失值先按0填掉（口径同跳NaN的sum）：带NaN的列降不下float，
+    # 后面bincount的NaN权重经astype(int64)会变成垃圾值
+    for c in NEEDED_COLS[1:]:
+        df[c] = pd.to_numeric(df[c].fillna(0), downcast='unsigned')
+
+    # 数据清洗：两个过滤条件合成一个布尔掩码，一次切片完成，
+    # 避免中间 DataFrame 拷贝和对点击列的二次扫描
     original_count = len(df)
-    df = df[df['点击UV(SUM)'] >= min_click_threshold]
-    df = df[df['点击UV(SUM)'] <= df['页面UV(SUM)']]
+    click = df['点击UV(SUM)'].to_numpy()
+    exposure = df['页面UV(SUM)'].to_numpy()
+    mask = (click >= min_click_threshold) & (click <= exposure)
+    df = df[mask]
 
     # 计算整体指标
     total_exposure = df['页面UV(SUM)'].sum()
@@ -81,22 +234,36 @@ def analyze_data_from_bytes(file_data, filename, min_click_threshold=10):
     click_cvr = round((total_convert / total_click * 100) if total_click > 0 else 0, 2)
     order_cvr = round((total_order / total_click * 100) if total_click > 0 else 0, 2)
 
-    # 按点击事件分组分析
-    event_analysis = df.groupby('点击事件名称').agg({
-        '页面UV(SUM)': 'sum',
-        '点击UV(SUM)': 'sum',
-        '点击用户提交单(SUM)': 'sum',
-        '点击用户预订单(SUM)': 'sum'
-    }).reset_index()
-
-    event_analysis.columns = ['点击事件名称', '曝光人数', '点击人数', '转化人数', '下单人数']
-    event_analysis['点击率(CTR)'] = (event_analysis['点击人数'] / event_analysis['曝光人数'] * 100).round(2)
-    event_analysis['点击转化率'] = (event_analysis['转化人数'] / event_analysis['点击人数'] * 100).round(2)
-    event_analysis['下单转化率'] = (event_analysis['下单人数'] / event_analysis['点击人数'] * 100).round(2)
-    event_analysis = event_analysis.sort_values('点击率(CTR)', ascending=False)
-
-    # 获取Top 50
-    top_modules = event_analysis.head(50)
+    # 按点击事件分组分析：事件名先编码为整数码，四个指标各走一次 bincount，
+    # 分组求和变成整数码上的紧凑C循环，绕开 pandas groupby 的哈希和装配开销
+    events = df['点击事件名称'].astype('category')
+    event_codes = events.cat.codes.to_numpy()
+    n_events = len(events.cat.categories)
+    event_analysis = pd.DataFrame({
+        '点击事件名称': events.cat.categories,
+        '曝光人数': np.bincount(event_codes, weights=df['页面UV(SUM)'].to_numpy(),
+                            minlength=n_events).astype(np.int64),
+        '点击人数': np.bincount(event_codes, weights=df['点击UV(SUM)'].to_numpy(),
+                            minlength=n_events).astype(np.int64),
+        '转化人数': np.bincount(event_codes, weights=df['点击用户提交单(SUM)'].to_numpy(),
+                            minlength=n_events).astype(np.int64),
+        '下单人数': np.bincount(event_codes, weights=df['点击用户预订单(SUM)'].to_numpy(),
+                            minlength=n_events).astype(np.int64),
+    })
+
+    # 三个比率共享同一份点击/曝光numpy数组，点击列只从内存读一次；
+    # 排序直接对CTR数组argsort后整体重排一次
+    event_clicks = event_analysis['点击人数'].to_numpy()
+    event_exposure = event_analysis['曝光人数'].to_numpy()
+    ctr_arr = np.round(event_clicks / event_exposure * 100, 2)
+    event_analysis['点击率(CTR)'] = ctr_arr
+    event_analysis['点击转化率'] = np.round(
+        event_analysis['转化人数'].to_numpy() / event_clicks * 100, 2)
+    event_analysis['下单转化率'] = np.round(
+        event_analysis['下单人数'].to_numpy() / event_clicks * 100, 2)
+
+    # 获取Top 50：按CTR argsort 后只切前50行，不重排整个事件表
+    top_modules = event_analysis.iloc[np.argsort(-ctr_arr, kind='stable')[:50]]
 
     # 生成简化的HTML报告
     report_html = generate_simple_html_report(
@@ -122,137 +289,22 @@ def analyze_data_from_bytes(file_data, filename, min_click_threshold=10):
 def generate_simple_html_report(filename, rows, original_rows, ctr, click_cvr, order_cvr,
                                  total_exposure, total_click, total_convert, total_order,
                                  top_modules, min_click_threshold):
-    """生成简化的HTML报告"""
-
-    html = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>📊 数据分析报告</title>
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 20px;
-            line-height: 1.6;
-        }}
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 20px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            overflow: hidden;
-        }}
-        header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 40px;
-            text-align: center;
-        }}
-        header h1 {{ font-size: 2em; margin-bottom: 10px; }}
-        .content {{ padding: 40px; }}
-        .metrics-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            margin-bottom: 40px;
-        }}
-        .metric-card {{
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-            border-radius: 15px;
-            padding: 25px;
-            text-align: center;
-        }}
-        .metric-label {{ font-size: 0.9em; color: #666; margin-bottom: 10px; }}
-        .metric-value {{ font-size: 2em; font-weight: bold; color: #667eea; }}
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 20px;
-        }}
-        th, td {{ padding: 12px; text-align: left; border-bottom: 1px solid #eee; }}
-        th {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-        }}
-        tr:hover {{ background: #f5f7fa; }}
-        .footer {{
-            text-align: center;
-            padding: 30px;
-            background: #f8f9fa;
-            color: #666;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <h1>📊 数据分析报告</h1>
-            <p>生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-            <p>数据源: {filename} | 分析记录: {rows:,} / {original_rows:,} 条</p>
-        </header>
-        <div class="content">
-            <div class="metrics-grid">
-                <div class="metric-card">
-                    <div class="metric-label">点击率 CTR</div>
-                    <div class="metric-value">{ctr}%</div>
-                    <div style="font-size: 0.85em; color: #888;">曝光 {total_exposure:,}</div>
-                </div>
-                <div class="metric-card">
-                    <div class="metric-label">点击转化率</div>
-                    <div class="metric-value">{click_cvr}%</div>
-                    <div style="font-size: 0.85em; color: #888;">点击 {total_click:,}</div>
-                </div>
-                <div class="metric-card">
-                    <div class="metric-label">下单转化率</div>
-                    <div class="metric-value">{order_cvr}%</div>
-                    <div style="font-size: 0.85em; color: #888;">下单 {total_order:,}</div>
-                </div>
-            </div>
-            <h2 style="margin-bottom: 20px;">🎯 Top 50 高点击率模块</h2>
-            <table>
-                <thead>
-                    <tr>
-                        <th>排名</th>
-                        <th>模块名称</th>
-                        <th>曝光</th>
-                        <th>点击</th>
-                        <th>点击率</th>
-                        <th>转化率</th>
-                    </tr>
-                </thead>
-                <tbody>
-"""
-
-    for idx, row in top_modules.iterrows():
-        rank = idx + 1
-        html += f"""
-                    <tr>
-                        <td>{rank}</td>
-                        <td><strong>{row['点击事件名称']}</strong></td>
-                        <td>{row['曝光人数']:,}</td>
-                        <td>{row['点击人数']:,}</td>
-                        <td>{row['点击率(CTR)']}%</td>
-                        <td>{row['点击转化率']}%</td>
-                    </tr>
-"""
-
-    html += f"""
-                </tbody>
-            </table>
-        </div>
-        <div class="footer">
-            <p>🤖 数据分析工具 | 部署在 Vercel</p>
-            <p style="margin-top: 10px; font-size: 0.9em;">数据清洗规则: 点击量 ≥ {min_click_threshold}</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-    return html
+    """生成简化的HTML报告（Jinja2模板，首次使用时编译成字节码并缓存）"""
+    template = app.jinja_env.get_template('report.html.j2')
+    return template.render(
+        gen_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        filename=filename,
+        rows=rows,
+        original_rows=original_rows,
+        ctr=ctr,
+        click_cvr=click_cvr,
+        order_cvr=order_cvr,
+        total_exposure=total_exposure,
+        total_click=total_click,
+        total_order=total_order,
+        top_modules=top_modules.to_dict('records'),
+        min_click_threshold=min_click_threshold
+    )
 
 
 @app.route('/')
@@ -310,22 +362,24 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': '不支持的文件格式，请上传 .xlsx, .xls 或 .csv 文件'}), 400
 
-        # 读取文件数据
-        file_data = file.read()
-        file_size = len(file_data)
         original_filename = file.filename
 
-        # 保存到数据库
-        upload_id = save_upload(original_filename, file_data, file_size)
-
         # 获取参数
         min_click = int(request.form.get('min_click', 10))
 
-        # 分析数据并生成报告
-        report_html, data_info = analyze_data_from_bytes(file_data, original_filename, min_click)
+        # 直接从 werkzeug 的上传流（大文件已落盘到临时文件）解析，
+        # 解析阶段的内存峰值不再额外叠加一份完整的 bytes 拷贝
+        report_html, data_info = analyze_data_cached(file.stream, original_filename, min_click)
 
-        # 保存报告到数据库
-        report_id = save_report(upload_id, report_html, data_info)
+        # 入库的 BYTEA 绑定参数需要完整字节串，分析成功后再读一次流
+        file.stream.seek(0)
+        file_data = file.stream.read()
+        file_size = len(file_data)
+
+        # 上传文件和报告一次往返写入数据库
+        upload_id, report_id = save_upload_and_report(
+            original_filename, file_data, file_size, report_html, data_info
+        )
 
         # 返回成功响应
         return jsonify({
@@ -346,13 +400,12 @@ def upload_file():
 def view_report(report_id):
     """在浏览器中查看报告"""
     try:
-        report = get_report(report_id)
+        report = cached_get_report(report_id)
         if not report:
             return "报告不存在", 404
 
-        response = make_response(report['report_html'])
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        return response
+        return Response(_iter_report_html(report),
+                        mimetype='text/html; charset=utf-8')
     except Exception as e:
         return f"错误: {str(e)}", 500
 
@@ -361,12 +414,12 @@ def view_report(report_id):
 def download_report(report_id):
     """下载报告"""
     try:
-        report = get_report(report_id)
+        report = cached_get_report(report_id)
         if not report:
             return "报告不存在", 404
 
-        response = make_response(report['report_html'])
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
+        response = Response(_iter_report_html(report),
+                            mimetype='text/html; charset=utf-8')
         response.headers['Content-Disposition'] = f'attachment; filename=report_{report_id}.html'
         return response
     except Exception as e:
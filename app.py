@@ -5,19 +5,34 @@
 本地运行的Web服务，通过浏览器访问，100%数据本地化
 """
 
-from flask import Flask, render_template, request, send_file, jsonify, url_for
+from quart import Quart, render_template, request, send_file, jsonify, url_for
+import asyncio
 import os
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
-from werkzeug.utils import secure_filename
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import FileTarget, ValueTarget
 import sys
+import traceback
 
-# 导入分析功能
 sys.path.append(str(Path(__file__).parent))
-from generate_offline_report import generate_offline_html_report
 
-app = Flask(__name__)
+# 分析模块连带pandas的导入要花好几秒，推迟到第一次上传再加载，
+# 服务启动和静态路由不付这笔冷启动开销
+_generate_report = None
+
+
+def _get_report_generator():
+    """首次调用时导入并缓存报告生成函数"""
+    global _generate_report
+    if _generate_report is None:
+        from generate_offline_report import generate_offline_html_report
+        _generate_report = generate_offline_html_report
+    return _generate_report
+
+# Quart 是异步版的 Flask：Werkzeug 开发服务器一次只能处理一个请求，
+# 一个慢分析会把其他用户全部阻塞；异步事件循环下请求不再互相排队
+app = Quart(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 app.config['UPLOAD_FOLDER'] = Path(__file__).parent / 'uploads'
 app.config['REPORT_FOLDER'] = Path(__file__).parent / 'reports'
@@ -27,73 +42,68 @@ app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 app.config['UPLOAD_FOLDER'].mkdir(exist_ok=True)
 app.config['REPORT_FOLDER'].mkdir(exist_ok=True)
 
-ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
-
-
-def allowed_file(filename):
-    """检查文件扩展名是否允许"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+ALLOWED_EXTENSIONS = frozenset(('xlsx', 'xls', 'csv'))
 
 
 @app.route('/')
-def index():
+async def index():
     """主页"""
-    return render_template('index.html')
+    return await render_template('index.html')
 
 
 @app.route('/upload', methods=['POST'])
-def upload_file():
+async def upload_file():
     """处理文件上传和分析"""
     try:
-        # 检查文件
-        if 'file' not in request.files:
-            return jsonify({'error': '未选择文件'}), 400
+        # 流式解析 multipart：请求体按块到达就直接写进目标文件，
+        # 整个50MB的上传不再于内存中攒出完整一份拷贝
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        tmp_path = app.config['UPLOAD_FOLDER'] / f"{timestamp}.part"
 
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': '未选择文件'}), 400
+        parser = StreamingFormDataParser(headers=request.headers)
+        file_target = FileTarget(str(tmp_path))
+        min_click_target = ValueTarget()
+        parser.register('file', file_target)
+        parser.register('min_click', min_click_target)
 
-        if not allowed_file(file.filename):
-            return jsonify({'error': '不支持的文件格式，请上传 .xlsx, .xls 或 .csv 文件'}), 400
+        async for chunk in request.body:
+            parser.data_received(chunk)
 
-        # 保存文件
-        # 从原始文件名提取扩展名
-        original_filename = file.filename
-        if '.' in original_filename:
-            file_ext = original_filename.rsplit('.', 1)[-1].lower()
-        else:
-            file_ext = ''
+        # 文件名要等解析完 multipart 头才能拿到
+        original_filename = file_target.multipart_filename
+        if not original_filename:
+            tmp_path.unlink(missing_ok=True)
+            return jsonify({'error': '未选择文件'}), 400
 
-        # 生成安全的文件名
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        saved_filename = f"{timestamp}.{file_ext}" if file_ext else f"{timestamp}_file"
+        # 扩展名只提取一次，校验和落盘命名共用同一个结果
+        file_ext = Path(original_filename).suffix.lower().lstrip('.')
+        if file_ext not in ALLOWED_EXTENSIONS:
+            tmp_path.unlink(missing_ok=True)
+            return jsonify({'error': '不支持的文件格式，请上传 .xlsx, .xls 或 .csv 文件'}), 400
 
+        saved_filename = f"{timestamp}.{file_ext}"
         file_path = app.config['UPLOAD_FOLDER'] / saved_filename
-        file.save(str(file_path))
+        tmp_path.rename(file_path)
 
         # 获取参数
-        min_click = int(request.form.get('min_click', 10))
+        min_click = int(min_click_target.value.decode() or 10)
 
         # 生成报告
         report_filename = f"report_{timestamp}.html"
         report_path = app.config['REPORT_FOLDER'] / report_filename
 
-        # 调用分析函数
-        generate_offline_html_report(
+        # 分析是CPU密集型的，丢到线程里跑，事件循环继续服务其他请求；
+        # 返回的行列数直接用于 data_info，不再把同一个文件重新解析一遍
+        report_info = await asyncio.to_thread(
+            _get_report_generator(),
             str(file_path),
             str(report_path),
             min_click_threshold=min_click
         )
 
-        # 读取数据基本信息
-        if file_path.suffix in ['.xlsx', '.xls']:
-            df = pd.read_excel(str(file_path))
-        else:
-            df = pd.read_csv(str(file_path))
-
         data_info = {
-            'rows': len(df),
-            'columns': len(df.columns),
+            'rows': report_info['rows'],
+            'columns': report_info['columns'],
             'filename': original_filename
         }
 
@@ -106,42 +116,46 @@ def upload_file():
         })
 
     except Exception as e:
-        import traceback
         error_details = traceback.format_exc()
         print(f"\n❌ 错误详情:\n{error_details}")
         return jsonify({'error': f'分析失败: {str(e)}'}), 500
 
 
 @app.route('/report/<filename>')
-def view_report(filename):
+async def view_report(filename):
     """在浏览器中查看报告"""
     report_path = app.config['REPORT_FOLDER'] / filename
     if not report_path.exists():
         return "报告不存在", 404
-    return send_file(str(report_path))
+    return await send_file(str(report_path))
 
 
 @app.route('/download/<filename>')
-def download_report(filename):
+async def download_report(filename):
     """下载报告"""
     report_path = app.config['REPORT_FOLDER'] / filename
     if not report_path.exists():
         return "报告不存在", 404
-    return send_file(str(report_path), as_attachment=True)
+    return await send_file(str(report_path), as_attachment=True)
 
 
 @app.route('/reports')
-def list_reports():
+async def list_reports():
     """列出所有历史报告"""
     reports = []
-    for file in sorted(app.config['REPORT_FOLDER'].glob('*.html'), reverse=True):
-        stat = file.stat()
+    # scandir 的 DirEntry 复用读目录时拿到的stat缓存，
+    # 每个条目只付一次stat系统调用；glob+Path.stat要两次
+    with os.scandir(app.config['REPORT_FOLDER']) as it:
+        entries = [e for e in it if e.name.endswith('.html')]
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in entries:
+        stat = entry.stat()
         reports.append({
-            'filename': file.name,
+            'filename': entry.name,
             'size': f"{stat.st_size / 1024:.1f} KB",
             'created': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-            'view_url': url_for('view_report', filename=file.name),
-            'download_url': url_for('download_report', filename=file.name)
+            'view_url': url_for('view_report', filename=entry.name),
+            'download_url': url_for('download_report', filename=entry.name)
         })
     return jsonify(reports)
 
@@ -166,4 +180,7 @@ if __name__ == '__main__':
     print("\n" + "="*70 + "\n")
 
     # 使用 0.0.0.0 使其可以从外部访问（云部署需要）
-    app.run(host='0.0.0.0', port=PORT, debug=False)
+    # uvicorn 直接跑 ASGI 应用；多worker部署可用:
+    #   uvicorn app:app --host 0.0.0.0 --port $PORT --workers 4
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=PORT)
@@ -12,10 +12,33 @@ import sys
 from pathlib import Path
 from datetime import datetime
 
+# 尝试导入 numba：分组求和编译成机器码后按整数码一趟累加，
+# 连pandas groupby的哈希和结果装配开销都省掉；不可用时回退到 .agg
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except Exception:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _group_sums(codes, values, ngroups):
+        """按分组码对各指标列累加，codes 来自 pd.factorize"""
+        out = np.zeros((ngroups, values.shape[1]), dtype=np.int64)
+        for i in range(codes.shape[0]):
+            c = codes[i]
+            for j in range(values.shape[1]):
+                out[c, j] += values[i, j]
+        return out
+
 
 class FunnelAnalyzer:
     """漏斗分析核心类"""
 
+    # 漏斗四个计数列，按 曝光->点击->转化->下单 的顺序
+    _METRIC_COLS = ['页面UV(SUM)', '点击UV(SUM)', '点击用户提交单(SUM)', '点击用户预订单(SUM)']
+
     def __init__(self, file_path, min_click_threshold=10):
         """
         初始化分析器
@@ -28,14 +51,25 @@ class FunnelAnalyzer:
         self.min_click_threshold = min_click_threshold
         self.df = None
         self.report = []
+        self._metrics_arr = None
+        self._group_codes = {}
 
     def load_data(self):
         """加载数据文件"""
         try:
             if self.file_path.endswith('.xlsx') or self.file_path.endswith('.xls'):
-                self.df = pd.read_excel(self.file_path)
+                try:
+                    # calamine 是 Rust 实现的Excel解析器，比openpyxl快约10倍；
+                    # 环境里没有时回退到pandas默认引擎
+                    self.df = pd.read_excel(self.file_path, engine='calamine')
+                except (ImportError, ValueError):
+                    self.df = pd.read_excel(self.file_path)
             elif self.file_path.endswith('.csv'):
-                self.df = pd.read_csv(self.file_path)
+                try:
+                    # pyarrow 引擎多线程解析CSV，大文件上比默认C引擎快数倍
+                    self.df = pd.read_csv(self.file_path, engine='pyarrow')
+                except (ImportError, ValueError):
+                    self.df = pd.read_csv(self.file_path)
             else:
                 raise ValueError("不支持的文件格式，请使用 .xlsx, .xls 或 .csv 文件")
 
@@ -70,15 +104,23 @@ class FunnelAnalyzer:
         original_count = len(self.df)
         print(f"\n📊 原始数据: {original_count} 条记录")
 
-        # 1. 剔除点击量 < 阈值的长尾数据
-        self.df = self.df[self.df['点击UV(SUM)'] >= self.min_click_threshold]
-        after_click_filter = len(self.df)
+        # 1+2. 长尾过滤和异常过滤合成一个布尔掩码，一次切片完成，
+        # 省掉中间DataFrame拷贝和对点击列的二次扫描
+        click = self.df['点击UV(SUM)'].to_numpy()
+        exposure = self.df['页面UV(SUM)'].to_numpy()
+        click_ok = click >= self.min_click_threshold
+        mask = click_ok & (click <= exposure)
+
+        after_click_filter = int(click_ok.sum())
         print(f"  ✓ 剔除点击量 < {self.min_click_threshold} 的数据: {original_count - after_click_filter} 条")
+        print(f"  ✓ 剔除点击 > 曝光的异常数据: {after_click_filter - int(mask.sum())} 条")
+        self.df = self.df.loc[mask]
 
-        # 2. 剔除异常数据（点击 > 曝光）
-        self.df = self.df[self.df['点击UV(SUM)'] <= self.df['页面UV(SUM)']]
-        after_anomaly_filter = len(self.df)
-        print(f"  ✓ 剔除点击 > 曝光的异常数据: {after_click_filter - after_anomaly_filter} 条")
+        # 日期列过滤后就地解析一次：已是datetime64就不再碰；
+        # 字符串列指明ISO格式走C解析器并开缓存，比逐元素dateutil推断快一个量级
+        if '日期' in self.df.columns and not np.issubdtype(self.df['日期'].dtype, np.datetime64):
+            self.df['日期'] = pd.to_datetime(
+                self.df['日期'], format='ISO8601', cache=True, errors='coerce')
 
         # 3. 检查缺失值
         null_counts = self.df.isnull().sum()
@@ -91,6 +133,24 @@ class FunnelAnalyzer:
 
         print(f"\n✓ 清洗后数据: {len(self.df)} 条记录")
 
+        # 清洗完成后指标列不再变化，物化成紧凑数组供后续归约复用
+        self._prep_arrays()
+
+    def _prep_arrays(self):
+        """把指标列物化为一块连续数组，并缓存各维度的分组码
+
+        后续所有求和都在这块紧凑内存上跑，不再按标签反复取列；
+        计数存成int32（UV计数远小于2^31），相对int64带宽减半。
+        每个分组维度只 factorize 一次，结果供多次聚合复用。
+        """
+        # 缺失值先按0填掉再cast：NaN直接转int32会变成INT32_MIN级的
+        # 垃圾值污染所有下游求和，填0与Series.sum跳过NaN的口径一致
+        self._metrics_arr = self.df[self._METRIC_COLS].fillna(0).to_numpy(dtype=np.int32)
+        self._group_codes = {}
+        for col in ('点击事件名称', '平台', '日期'):
+            if col in self.df.columns:
+                self._group_codes[col] = pd.factorize(self.df[col])
+
     def calculate_metrics(self, group_df):
         """
         计算核心指标
@@ -101,10 +161,14 @@ class FunnelAnalyzer:
         Returns:
             dict: 包含各项指标的字典
         """
-        total_exposure = group_df['页面UV(SUM)'].sum()
-        total_click = group_df['点击UV(SUM)'].sum()
-        total_convert = group_df['点击用户提交单(SUM)'].sum()
-        total_order = group_df['点击用户预订单(SUM)'].sum()
+        # 四列一次性取成二维数组，单次C级归约同时得到四个总和，
+        # 比四次独立的Series.sum()少三趟内存扫描；
+        # 整表统计直接复用 _prep_arrays 物化好的连续块
+        if group_df is self.df and self._metrics_arr is not None:
+            arr = self._metrics_arr
+        else:
+            arr = group_df[self._METRIC_COLS].to_numpy()
+        total_exposure, total_click, total_convert, total_order = arr.sum(axis=0)
 
         # 避免除零错误
         ctr = (total_click / total_exposure * 100) if total_exposure > 0 else 0
@@ -121,6 +185,54 @@ class FunnelAnalyzer:
             'order_cvr': round(order_cvr, 2)
         }
 
+    def _grouped_funnel(self, group_col, sort=True):
+        """按指定维度分组聚合漏斗指标
+
+        四个sum走一次命名聚合的C内核，比率在结果列的numpy数组上
+        整列计算，全程没有按组的Python回调。
+
+        Args:
+            group_col: 分组列名（如 '平台'、'日期'）
+            sort: 是否按分组键排序。日期趋势依赖时序必须排；
+                  平台这类无序维度传False省掉一趟哈希后排序
+
+        Returns:
+            DataFrame: 以分组值为索引，含 exposure/click/convert/order
+                       及 ctr/click_cvr/order_cvr 列
+        """
+        if NUMBA_AVAILABLE:
+            # 分组键编码成整数码后，四列求和走编译后的紧凑循环；
+            # 分组码和指标块优先用 _prep_arrays 缓存的版本
+            cached = self._group_codes.get(group_col)
+            codes, uniques = cached if cached is not None else pd.factorize(self.df[group_col])
+            if self._metrics_arr is not None:
+                values = self._metrics_arr
+            else:
+                values = self.df[self._METRIC_COLS].to_numpy(dtype=np.int64)
+            sums = _group_sums(codes, values, len(uniques))
+            grouped = pd.DataFrame(
+                sums,
+                columns=['exposure', 'click', 'convert', 'order'],
+                index=pd.Index(uniques, name=group_col)
+            )
+            if sort:
+                grouped = grouped.sort_index()
+        else:
+            grouped = self.df.groupby(group_col, sort=sort).agg(
+                exposure=('页面UV(SUM)', 'sum'),
+                click=('点击UV(SUM)', 'sum'),
+                convert=('点击用户提交单(SUM)', 'sum'),
+                order=('点击用户预订单(SUM)', 'sum'),
+            )
+        exposure = grouped['exposure'].to_numpy()
+        clicks = grouped['click'].to_numpy()
+        grouped['ctr'] = np.where(exposure > 0, clicks / exposure * 100, 0).round(2)
+        grouped['click_cvr'] = np.where(
+            clicks > 0, grouped['convert'].to_numpy() / clicks * 100, 0).round(2)
+        grouped['order_cvr'] = np.where(
+            clicks > 0, grouped['order'].to_numpy() / clicks * 100, 0).round(2)
+        return grouped
+
     def multi_dimensional_analysis(self):
         """步骤2: 多维交叉分析"""
         print("\n" + "="*80)
@@ -142,26 +254,39 @@ class FunnelAnalyzer:
         self.overall_metrics = overall_metrics
 
         # 2. 按点击事件分析（模块级分析）
+        # 四个指标共用一份factorize出的分组码，各走一次bincount：
+        # 分组求和变成整数码上的单趟C循环，连groupby的结果装配都省掉
         print("\n📊 按点击事件分组分析:")
-        event_analysis = self.df.groupby('点击事件名称').apply(
-            lambda x: pd.Series({
-                '曝光人数': x['页面UV(SUM)'].sum(),
-                '点击人数': x['点击UV(SUM)'].sum(),
-                '转化人数': x['点击用户提交单(SUM)'].sum(),
-                '下单人数': x['点击用户预订单(SUM)'].sum(),
-            })
-        ).reset_index()
-
-        # 计算指标
-        event_analysis['点击率(CTR)'] = (
-            event_analysis['点击人数'] / event_analysis['曝光人数'] * 100
-        ).round(2)
-        event_analysis['点击转化率'] = (
-            event_analysis['转化人数'] / event_analysis['点击人数'] * 100
-        ).round(2)
-        event_analysis['下单转化率'] = (
-            event_analysis['下单人数'] / event_analysis['点击人数'] * 100
-        ).round(2)
+        cached = self._group_codes.get('点击事件名称')
+        codes, uniques = cached if cached is not None else pd.factorize(self.df['点击事件名称'])
+        ngroups = len(uniques)
+        # 权重取 _prep_arrays 填过缺失值的紧凑块：NaN权重会把整组的和
+        # 带成NaN，astype(int64)再把它转成垃圾值
+        if self._metrics_arr is not None:
+            m = self._metrics_arr
+        else:
+            m = self.df[self._METRIC_COLS].fillna(0).to_numpy(dtype=np.int64)
+        event_analysis = pd.DataFrame({
+            '点击事件名称': uniques,
+            '曝光人数': np.bincount(codes, weights=m[:, 0],
+                                minlength=ngroups).astype(np.int64),
+            '点击人数': np.bincount(codes, weights=m[:, 1],
+                                minlength=ngroups).astype(np.int64),
+            '转化人数': np.bincount(codes, weights=m[:, 2],
+                                minlength=ngroups).astype(np.int64),
+            '下单人数': np.bincount(codes, weights=m[:, 3],
+                                minlength=ngroups).astype(np.int64),
+        })
+
+        # 计算指标：在numpy数组上整列算比率，除零位置直接置0
+        exposure = event_analysis['曝光人数'].to_numpy()
+        clicks = event_analysis['点击人数'].to_numpy()
+        event_analysis['点击率(CTR)'] = np.where(
+            exposure > 0, clicks / exposure * 100, 0).round(2)
+        event_analysis['点击转化率'] = np.where(
+            clicks > 0, event_analysis['转化人数'].to_numpy() / clicks * 100, 0).round(2)
+        event_analysis['下单转化率'] = np.where(
+            clicks > 0, event_analysis['下单人数'].to_numpy() / clicks * 100, 0).round(2)
 
         # 按点击率降序排列
         event_analysis = event_analysis.sort_values('点击率(CTR)', ascending=False)
@@ -172,19 +297,15 @@ class FunnelAnalyzer:
         # 3. 按平台分析
         if '平台' in self.df.columns:
             print("\n📊 按平台分组分析:")
-            platform_analysis = self.df.groupby('平台').apply(
-                lambda x: pd.Series(self.calculate_metrics(x))
-            )
+            platform_analysis = self._grouped_funnel('平台', sort=False)
             print(platform_analysis[['ctr', 'click_cvr', 'order_cvr']])
             self.platform_analysis = platform_analysis
 
         # 4. 按日期趋势分析
         if '日期' in self.df.columns:
             print("\n📊 按日期趋势分析:")
-            self.df['日期'] = pd.to_datetime(self.df['日期'])
-            date_analysis = self.df.groupby('日期').apply(
-                lambda x: pd.Series(self.calculate_metrics(x))
-            )
+            # 日期列已在 audit_and_clean 中解析为 datetime64
+            date_analysis = self._grouped_funnel('日期')
             self.date_analysis = date_analysis
             print(f"  ✓ 时间跨度: {self.df['日期'].min()} 至 {self.df['日期'].max()}")
             print(f"  ✓ 共 {len(date_analysis)} 天数据")
@@ -216,15 +337,18 @@ class FunnelAnalyzer:
             # 取最近10天的数据
             recent_dates = self.date_analysis.tail(10)
 
+            # 日期格式化和数值转字符串都整列向量化完成，join直接吃数组
+            date_labels = recent_dates.index.strftime('%m-%d')
+
             mermaid_line = "```mermaid\n"
             mermaid_line += "%%{init: {'theme':'base'}}%%\n"
             mermaid_line += "xychart-beta\n"
             mermaid_line += "    title \"核心指标趋势 (最近10天)\"\n"
-            mermaid_line += "    x-axis [" + ", ".join([f'"{d.strftime("%m-%d")}"' for d in recent_dates.index]) + "]\n"
+            mermaid_line += "    x-axis [\"" + "\", \"".join(date_labels) + "\"]\n"
             mermaid_line += "    y-axis \"转化率 (%)\" 0 --> 100\n"
-            mermaid_line += "    line [" + ", ".join([str(v) for v in recent_dates['ctr'].values]) + "]\n"
-            mermaid_line += "    line [" + ", ".join([str(v) for v in recent_dates['click_cvr'].values]) + "]\n"
-            mermaid_line += "    line [" + ", ".join([str(v) for v in recent_dates['order_cvr'].values]) + "]\n"
+            mermaid_line += "    line [" + ", ".join(recent_dates['ctr'].to_numpy().astype(str)) + "]\n"
+            mermaid_line += "    line [" + ", ".join(recent_dates['click_cvr'].to_numpy().astype(str)) + "]\n"
+            mermaid_line += "    line [" + ", ".join(recent_dates['order_cvr'].to_numpy().astype(str)) + "]\n"
             mermaid_line += "```\n"
 
             visualizations.append(("漏斗趋势图", mermaid_line))
@@ -238,11 +362,12 @@ class FunnelAnalyzer:
             mermaid_bar += "xychart-beta\n"
             mermaid_bar += "    title \"Top 10 模块点击率对比\"\n"
 
-            # 简化模块名称（取前10个字符）
-            labels = [name[:10] + "..." if len(name) > 10 else name for name in top10['点击事件名称'].values]
-            mermaid_bar += "    x-axis [" + ", ".join([f'"{label}"' for label in labels]) + "]\n"
+            # 简化模块名称（取前10个字符）：截断和补省略号走Series的str向量操作
+            names = top10['点击事件名称'].astype(str)
+            labels = names.str.slice(0, 10) + np.where(names.str.len() > 10, '...', '')
+            mermaid_bar += "    x-axis [\"" + "\", \"".join(labels) + "\"]\n"
             mermaid_bar += "    y-axis \"点击率 (%)\" 0 --> 100\n"
-            mermaid_bar += "    bar [" + ", ".join([str(v) for v in top10['点击率(CTR)'].values]) + "]\n"
+            mermaid_bar += "    bar [" + ", ".join(top10['点击率(CTR)'].to_numpy().astype(str)) + "]\n"
             mermaid_bar += "```\n"
 
             visualizations.append(("Top 10模块点击率", mermaid_bar))
@@ -292,26 +417,32 @@ class FunnelAnalyzer:
                 'title': '🏆 高价值模块推荐',
                 'content': [
                     "以下模块点击率最高，建议重点推广:",
-                    *[f"- **{row['点击事件名称']}**: CTR {row['点击率(CTR)']}%, 下单CVR {row['下单转化率']}%"
-                      for _, row in top5.iterrows()]
+                    # 三列各取一次numpy数组zip着走，避开iterrows按行构造Series
+                    *[f"- **{name}**: CTR {ctr_val}%, 下单CVR {cvr_val}%"
+                      for name, ctr_val, cvr_val in zip(top5['点击事件名称'].to_numpy(),
+                                                        top5['点击率(CTR)'].to_numpy(),
+                                                        top5['下单转化率'].to_numpy())]
                 ]
             })
 
         # 3. 低效模块预警
         if hasattr(self, 'event_analysis'):
-            # 找出点击率低但曝光量大的模块
-            low_ctr = self.event_analysis[
-                (self.event_analysis['点击率(CTR)'] < ctr * 0.5) &
-                (self.event_analysis['曝光人数'] > self.event_analysis['曝光人数'].median())
-            ].head(5)
+            # 找出点击率低但曝光量大的模块：条件在numpy数组上求值，
+            # flatnonzero直接取前5个行号，一次iloc切片，不走pandas布尔链
+            ctr_arr = self.event_analysis['点击率(CTR)'].to_numpy()
+            exp_arr = self.event_analysis['曝光人数'].to_numpy()
+            low_mask = (ctr_arr < ctr * 0.5) & (exp_arr > np.median(exp_arr))
+            low_ctr = self.event_analysis.iloc[np.flatnonzero(low_mask)[:5]]
 
             if len(low_ctr) > 0:
                 insights.append({
                     'title': '⚠️ 低效模块预警',
                     'content': [
                         "以下模块曝光量大但点击率低，需优化:",
-                        *[f"- **{row['点击事件名称']}**: CTR {row['点击率(CTR)']}% (曝光 {row['曝光人数']:,})"
-                          for _, row in low_ctr.iterrows()]
+                        *[f"- **{name}**: CTR {ctr_val}% (曝光 {exp_val:,})"
+                          for name, ctr_val, exp_val in zip(low_ctr['点击事件名称'].to_numpy(),
+                                                            low_ctr['点击率(CTR)'].to_numpy(),
+                                                            low_ctr['曝光人数'].to_numpy())]
                     ]
                 })
 
@@ -354,88 +485,87 @@ class FunnelAnalyzer:
         if output_path is None:
             output_path = f"funnel_analysis_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
 
-        report_lines = []
-
-        # 标题
-        report_lines.append("# 📊 模块转化效能深度分析报告\n")
-        report_lines.append(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        report_lines.append(f"**数据来源**: {Path(self.file_path).name}\n")
-        report_lines.append(f"**分析数据量**: {len(self.df):,} 条记录\n")
-        report_lines.append("\n---\n\n")
-
-        # 1. 核心指标总览
-        report_lines.append("## 1. 📋 核心指标总览\n\n")
-        report_lines.append("| 指标 | 数值 |\n")
-        report_lines.append("| :--- | :--- |\n")
-        report_lines.append(f"| **整体点击率 (CTR)** | **{self.overall_metrics['ctr']}%** |\n")
-        report_lines.append(f"| **整体点击转化率 (Click CVR)** | **{self.overall_metrics['click_cvr']}%** |\n")
-        report_lines.append(f"| **整体下单转化率 (Order CVR)** | **{self.overall_metrics['order_cvr']}%** |\n")
-        report_lines.append(f"| 总曝光人数 | {self.overall_metrics['exposure']:,} |\n")
-        report_lines.append(f"| 总点击人数 | {self.overall_metrics['click']:,} |\n")
-        report_lines.append(f"| 总转化人数 | {self.overall_metrics['convert']:,} |\n")
-        report_lines.append(f"| 总下单人数 | {self.overall_metrics['order']:,} |\n")
-        report_lines.append("\n")
-
-        # 2. Top 50 高点击率模块榜单
-        report_lines.append("## 2. 🏆 Top 50 高点击率模块榜单\n\n")
-        report_lines.append("按点击率降序排列，展示表现最优秀的模块:\n\n")
-
-        # 生成表格
-        report_lines.append("| 排名 | 模块名称 | 曝光人数 | 点击人数 | **点击率(CTR)** | 点击转化率 | 下单转化率 |\n")
-        report_lines.append("| :---: | :--- | ---: | ---: | ---: | ---: | ---: |\n")
-
-        for _, row in self.top_modules.iterrows():
-            report_lines.append(
-                f"| {row['排名']} "
-                f"| {row['点击事件名称']} "
-                f"| {row['曝光人数']:,} "
-                f"| {row['点击人数']:,} "
-                f"| **{row['点击率(CTR)']}%** "
-                f"| {row['点击转化率']}% "
-                f"| {row['下单转化率']}% |\n"
-            )
-
-        report_lines.append("\n")
-
-        # 3. 数据可视化
-        if hasattr(self, 'visualizations') and len(self.visualizations) > 0:
-            report_lines.append("## 3. 📈 可视化看板\n\n")
-
-            for viz_title, viz_code in self.visualizations:
-                report_lines.append(f"### {viz_title}\n\n")
-                report_lines.append(viz_code)
-                report_lines.append("\n")
-
-        # 4. 业务洞察与建议
-        if hasattr(self, 'insights'):
-            report_lines.append("## 4. 💡 业务洞察与优化建议\n\n")
-
-            for insight in self.insights:
-                report_lines.append(f"### {insight['title']}\n\n")
-                for content in insight['content']:
-                    report_lines.append(f"{content}\n")
-                report_lines.append("\n")
-
-        # 5. 附录
-        report_lines.append("## 5. 📎 附录\n\n")
-        report_lines.append("### 指标计算公式\n\n")
-        report_lines.append("1. **模块点击率 (CTR)** = `(点击人数 / 曝光人数) × 100%`\n")
-        report_lines.append("2. **点击转化率 (Click CVR)** = `(转化人数 / 点击人数) × 100%`\n")
-        report_lines.append("3. **下单转化率 (Order CVR)** = `(下单人数 / 点击人数) × 100%`\n\n")
-
-        report_lines.append("### 数据清洗规则\n\n")
-        report_lines.append(f"- 剔除点击量 < {self.min_click_threshold} 的长尾数据\n")
-        report_lines.append("- 剔除点击 > 曝光的异常数据\n")
-        report_lines.append("- 所有指标保留2位小数\n\n")
-
-        report_lines.append("---\n\n")
-        report_lines.append("*🤖 本报告由数据分析工具自动生成*\n")
-
-        # 写入文件
-        report_content = "".join(report_lines)
-
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(report_content)
+        # 边生成边写盘：不再把整份报告先攒进列表再join成一个大字符串，
+        # 峰值内存与报告大小解耦；大缓冲区让底层write系统调用保持很少
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            w = f.write
+
+            # 标题
+            w("# 📊 模块转化效能深度分析报告\n")
+            w(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            w(f"**数据来源**: {Path(self.file_path).name}\n")
+            w(f"**分析数据量**: {len(self.df):,} 条记录\n")
+            w("\n---\n\n")
+
+            # 1. 核心指标总览
+            w("## 1. 📋 核心指标总览\n\n")
+            w("| 指标 | 数值 |\n")
+            w("| :--- | :--- |\n")
+            w(f"| **整体点击率 (CTR)** | **{self.overall_metrics['ctr']}%** |\n")
+            w(f"| **整体点击转化率 (Click CVR)** | **{self.overall_metrics['click_cvr']}%** |\n")
+            w(f"| **整体下单转化率 (Order CVR)** | **{self.overall_metrics['order_cvr']}%** |\n")
+            w(f"| 总曝光人数 | {self.overall_metrics['exposure']:,} |\n")
+            w(f"| 总点击人数 | {self.overall_metrics['click']:,} |\n")
+            w(f"| 总转化人数 | {self.overall_metrics['convert']:,} |\n")
+            w(f"| 总下单人数 | {self.overall_metrics['order']:,} |\n")
+            w("\n")
+
+            # 2. Top 50 高点击率模块榜单
+            w("## 2. 🏆 Top 50 高点击率模块榜单\n\n")
+            w("按点击率降序排列，展示表现最优秀的模块:\n\n")
+
+            # 生成表格
+            w("| 排名 | 模块名称 | 曝光人数 | 点击人数 | **点击率(CTR)** | 点击转化率 | 下单转化率 |\n")
+            w("| :---: | :--- | ---: | ---: | ---: | ---: | ---: |\n")
+
+            # 整张表向量化拼出：数字列先整列格式化成字符串，
+            # 行内容在Series层一次拼接完成，不逐行逐格回到解释器
+            tm = self.top_modules
+            rows = ('| ' + tm['排名'].astype(str)
+                    + ' | ' + tm['点击事件名称'].astype(str)
+                    + ' | ' + tm['曝光人数'].map('{:,}'.format)
+                    + ' | ' + tm['点击人数'].map('{:,}'.format)
+                    + ' | **' + tm['点击率(CTR)'].astype(str)
+                    + '%** | ' + tm['点击转化率'].astype(str)
+                    + '% | ' + tm['下单转化率'].astype(str)
+                    + '% |\n')
+            f.writelines(rows.tolist())
+
+            w("\n")
+
+            # 3. 数据可视化
+            if hasattr(self, 'visualizations') and len(self.visualizations) > 0:
+                w("## 3. 📈 可视化看板\n\n")
+
+                for viz_title, viz_code in self.visualizations:
+                    w(f"### {viz_title}\n\n")
+                    w(viz_code)
+                    w("\n")
+
+            # 4. 业务洞察与建议
+            if hasattr(self, 'insights'):
+                w("## 4. 💡 业务洞察与优化建议\n\n")
+
+                for insight in self.insights:
+                    w(f"### {insight['title']}\n\n")
+                    for content in insight['content']:
+                        w(f"{content}\n")
+                    w("\n")
+
+            # 5. 附录
+            w("## 5. 📎 附录\n\n")
+            w("### 指标计算公式\n\n")
+            w("1. **模块点击率 (CTR)** = `(点击人数 / 曝光人数) × 100%`\n")
+            w("2. **点击转化率 (Click CVR)** = `(转化人数 / 点击人数) × 100%`\n")
+            w("3. **下单转化率 (Order CVR)** = `(下单人数 / 点击人数) × 100%`\n\n")
+
+            w("### 数据清洗规则\n\n")
+            w(f"- 剔除点击量 < {self.min_click_threshold} 的长尾数据\n")
+            w("- 剔除点击 > 曝光的异常数据\n")
+            w("- 所有指标保留2位小数\n\n")
+
+            w("---\n\n")
+            w("*🤖 本报告由数据分析工具自动生成*\n")
 
         print(f"\n✓ 报告已生成: {output_path}")
         return output_path
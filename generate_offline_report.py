@@ -5,219 +5,168 @@
 使用纯CSS实现数据可视化
 """
 
+import gzip
+import string
+
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
 
+# 报告只消费这6列；在读取阶段就裁剪，其余列连解析带内存都省掉
+NEEDED_COLS = ['日期', '点击事件名称', '页面UV(SUM)', '点击UV(SUM)',
+               '点击用户提交单(SUM)', '点击用户预订单(SUM)']
 
-def generate_offline_html_report(data_file, output_file=None, min_click_threshold=10):
-    """
-    生成完全离线的HTML报告（无任何外部依赖）
-
-    Args:
-        data_file: 数据文件路径
-        output_file: 输出HTML文件路径
-        min_click_threshold: 最小点击量阈值
-    """
-    # 转换为字符串处理
-    data_file = str(data_file)
-
-    # 加载数据
-    print(f"正在加载数据: {data_file}")
-    if data_file.endswith('.xlsx') or data_file.endswith('.xls'):
-        df = pd.read_excel(data_file)
-    elif data_file.endswith('.csv'):
-        df = pd.read_csv(data_file)
-    else:
-        raise ValueError("不支持的文件格式")
-
-    # 数据清洗
-    original_count = len(df)
-    df = df[df['点击UV(SUM)'] >= min_click_threshold]
-    df = df[df['点击UV(SUM)'] <= df['页面UV(SUM)']]
-    print(f"数据清洗: {original_count} -> {len(df)} 条记录")
-
-    # 计算整体指标
-    total_exposure = df['页面UV(SUM)'].sum()
-    total_click = df['点击UV(SUM)'].sum()
-    total_convert = df['点击用户提交单(SUM)'].sum()
-    total_order = df['点击用户预订单(SUM)'].sum()
-
-    ctr = round((total_click / total_exposure * 100) if total_exposure > 0 else 0, 2)
-    click_cvr = round((total_convert / total_click * 100) if total_click > 0 else 0, 2)
-    order_cvr = round((total_order / total_click * 100) if total_click > 0 else 0, 2)
-
-    # 按点击事件分组分析
-    event_analysis = df.groupby('点击事件名称').agg({
-        '页面UV(SUM)': 'sum',
-        '点击UV(SUM)': 'sum',
-        '点击用户提交单(SUM)': 'sum',
-        '点击用户预订单(SUM)': 'sum'
-    }).reset_index()
+# CTR徽章按阈值查表判级：digitize一次算出每行落在哪一档，
+# 档位边界只在这一处维护
+_BADGE_BINS = [20, 50]
+_BADGE_CLS = np.array(['badge-warning', 'badge-info', 'badge-success'])
 
-    event_analysis.columns = ['点击事件名称', '曝光人数', '点击人数', '转化人数', '下单人数']
-    event_analysis['点击率(CTR)'] = (event_analysis['点击人数'] / event_analysis['曝光人数'] * 100).round(2)
-    event_analysis['点击转化率'] = (event_analysis['转化人数'] / event_analysis['点击人数'] * 100).round(2)
-    event_analysis['下单转化率'] = (event_analysis['下单人数'] / event_analysis['点击人数'] * 100).round(2)
-    event_analysis = event_analysis.sort_values('点击率(CTR)', ascending=False)
-
-    # 获取Top 50
-    top_modules = event_analysis.head(50)
-
-    # 日期趋势分析
-    df['日期'] = pd.to_datetime(df['日期'])
-    date_analysis = df.groupby('日期').apply(
-        lambda x: pd.Series({
-            'ctr': round((x['点击UV(SUM)'].sum() / x['页面UV(SUM)'].sum() * 100), 2),
-            'click_cvr': round((x['点击用户提交单(SUM)'].sum() / x['点击UV(SUM)'].sum() * 100), 2),
-            'order_cvr': round((x['点击用户预订单(SUM)'].sum() / x['点击UV(SUM)'].sum() * 100), 2)
-        }), include_groups=False
-    ).reset_index()
-
-    # 准备趋势数据（最近15天）
-    trend_data = date_analysis.tail(15)
-
-    # 生成HTML
-    if output_file is None:
-        output_file = f"funnel_analysis_offline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+# 趋势点的行模板：%格式对这种定形模板比每轮重新求值的f-string更快，
+# 模板本身在导入时就构建好
+_TREND_TPL = """
+                        <div class="trend-point">
+                            <div class="trend-bars">
+                                <div class="trend-bar" style="background: #667eea; height: %.2f%%;" title="CTR: %.2f%%"></div>
+                                <div class="trend-bar" style="background: #f7931a; height: %.2f%%;" title="点击CVR: %.2f%%"></div>
+                                <div class="trend-bar" style="background: #2ed573; height: %.2f%%;" title="下单CVR: %.2f%%"></div>
+                            </div>
+                            <div class="trend-date">%s</div>
+                        </div>
+"""
 
-    html_content = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>📊 模块转化效能深度分析报告（完全离线版）</title>
-    <style>
-        * {{
+# 样式表抽成独立文件：随首份报告写到输出目录，各报告通过<link>
+# 共享同一份，浏览器也能跨报告缓存，每份HTML省下约8KB内联CSS
+_REPORT_CSS = """        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
 
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             padding: 20px;
             line-height: 1.6;
-        }}
+        }
 
-        .container {{
+        .container {
             max-width: 1400px;
             margin: 0 auto;
             background: white;
             border-radius: 20px;
             box-shadow: 0 20px 60px rgba(0,0,0,0.3);
             overflow: hidden;
-        }}
+        }
 
-        header {{
+        header {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 40px;
             text-align: center;
-        }}
+        }
 
-        header h1 {{
+        header h1 {
             font-size: 2.5em;
             margin-bottom: 10px;
             font-weight: 700;
-        }}
+        }
 
-        header .badge {{
+        header .badge {
             display: inline-block;
             background: rgba(255,255,255,0.2);
             padding: 8px 16px;
             border-radius: 20px;
             margin-top: 10px;
             font-size: 0.9em;
-        }}
+        }
 
-        .content {{
+        .content {
             padding: 40px;
-        }}
+        }
 
-        .metrics-grid {{
+        .metrics-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
             gap: 20px;
             margin-bottom: 40px;
-        }}
+        }
 
-        .metric-card {{
+        .metric-card {
             background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
             border-radius: 15px;
             padding: 25px;
             text-align: center;
             box-shadow: 0 4px 6px rgba(0,0,0,0.1);
             transition: transform 0.3s;
-        }}
+        }
 
-        .metric-card:hover {{
+        .metric-card:hover {
             transform: translateY(-5px);
-        }}
+        }
 
-        .metric-label {{
+        .metric-label {
             font-size: 0.9em;
             color: #666;
             margin-bottom: 10px;
             text-transform: uppercase;
             letter-spacing: 1px;
-        }}
+        }
 
-        .metric-value {{
+        .metric-value {
             font-size: 2.5em;
             font-weight: bold;
             color: #667eea;
-        }}
+        }
 
-        .metric-subtitle {{
+        .metric-subtitle {
             font-size: 0.85em;
             color: #888;
             margin-top: 8px;
-        }}
+        }
 
-        .section {{
+        .section {
             margin-bottom: 50px;
-        }}
+        }
 
-        .section-title {{
+        .section-title {
             font-size: 1.8em;
             margin-bottom: 20px;
             color: #333;
             border-left: 5px solid #667eea;
             padding-left: 15px;
-        }}
+        }
 
         /* 纯CSS条形图 */
-        .bar-chart {{
+        .bar-chart {
             background: #f8f9fa;
             border-radius: 15px;
             padding: 30px;
             box-shadow: 0 2px 8px rgba(0,0,0,0.1);
             margin-bottom: 30px;
-        }}
+        }
 
-        .bar-item {{
+        .bar-item {
             margin-bottom: 20px;
-        }}
+        }
 
-        .bar-label {{
+        .bar-label {
             font-size: 0.9em;
             color: #555;
             margin-bottom: 5px;
             display: flex;
             justify-content: space-between;
-        }}
+        }
 
-        .bar-wrapper {{
+        .bar-wrapper {
             height: 30px;
             background: #e0e0e0;
             border-radius: 15px;
             overflow: hidden;
             position: relative;
-        }}
+        }
 
-        .bar-fill {{
+        .bar-fill {
             height: 100%;
             background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
             border-radius: 15px;
@@ -229,107 +178,107 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
             font-weight: bold;
             font-size: 0.85em;
             transition: width 1s ease-out;
-        }}
+        }
 
-        .bar-fill.ctr {{ background: linear-gradient(90deg, #667eea 0%, #764ba2 100%); }}
-        .bar-fill.cvr {{ background: linear-gradient(90deg, #f7931a 0%, #f5576c 100%); }}
-        .bar-fill.order {{ background: linear-gradient(90deg, #2ed573 0%, #1e90ff 100%); }}
+        .bar-fill.ctr { background: linear-gradient(90deg, #667eea 0%, #764ba2 100%); }
+        .bar-fill.cvr { background: linear-gradient(90deg, #f7931a 0%, #f5576c 100%); }
+        .bar-fill.order { background: linear-gradient(90deg, #2ed573 0%, #1e90ff 100%); }
 
         /* 趋势线图（纯CSS） */
-        .trend-chart {{
+        .trend-chart {
             background: #f8f9fa;
             border-radius: 15px;
             padding: 30px;
             box-shadow: 0 2px 8px rgba(0,0,0,0.1);
             margin-bottom: 30px;
-        }}
+        }
 
-        .trend-legend {{
+        .trend-legend {
             display: flex;
             justify-content: center;
             gap: 30px;
             margin-bottom: 20px;
-        }}
+        }
 
-        .legend-item {{
+        .legend-item {
             display: flex;
             align-items: center;
             gap: 8px;
             font-size: 0.9em;
-        }}
+        }
 
-        .legend-color {{
+        .legend-color {
             width: 20px;
             height: 4px;
             border-radius: 2px;
-        }}
+        }
 
-        .trend-grid {{
+        .trend-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(60px, 1fr));
             gap: 10px;
             margin-top: 20px;
-        }}
+        }
 
-        .trend-point {{
+        .trend-point {
             text-align: center;
-        }}
+        }
 
-        .trend-bars {{
+        .trend-bars {
             height: 150px;
             display: flex;
             flex-direction: column;
             justify-content: flex-end;
             gap: 2px;
-        }}
+        }
 
-        .trend-bar {{
+        .trend-bar {
             border-radius: 3px;
             min-height: 2px;
-        }}
+        }
 
-        .trend-date {{
+        .trend-date {
             font-size: 0.75em;
             color: #666;
             margin-top: 5px;
-        }}
+        }
 
         /* 表格样式 */
-        .table-container {{
+        .table-container {
             overflow-x: auto;
             background: white;
             border-radius: 15px;
             box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        }}
+        }
 
-        table {{
+        table {
             width: 100%;
             border-collapse: collapse;
-        }}
+        }
 
-        thead {{
+        thead {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
-        }}
+        }
 
-        th {{
+        th {
             padding: 15px;
             text-align: left;
             font-weight: 600;
             position: sticky;
             top: 0;
-        }}
+        }
 
-        td {{
+        td {
             padding: 12px 15px;
             border-bottom: 1px solid #eee;
-        }}
+        }
 
-        tbody tr:hover {{
+        tbody tr:hover {
             background: #f5f7fa;
-        }}
+        }
 
-        .rank {{
+        .rank {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             border-radius: 50%;
@@ -339,84 +288,96 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
             align-items: center;
             justify-content: center;
             font-weight: bold;
-        }}
+        }
 
-        .rank.top3 {{
+        .rank.top3 {
             background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-        }}
+        }
 
-        .badge-pill {{
+        .badge-pill {
             display: inline-block;
             padding: 4px 12px;
             border-radius: 12px;
             font-size: 0.85em;
             font-weight: 600;
-        }}
+        }
 
-        .badge-success {{ background: #d4edda; color: #155724; }}
-        .badge-warning {{ background: #fff3cd; color: #856404; }}
-        .badge-info {{ background: #d1ecf1; color: #0c5460; }}
+        .badge-success { background: #d4edda; color: #155724; }
+        .badge-warning { background: #fff3cd; color: #856404; }
+        .badge-info { background: #d1ecf1; color: #0c5460; }
 
-        .insights {{
+        .insights {
             background: linear-gradient(135deg, #ffecd2 0%, #fcb69f 100%);
             border-radius: 15px;
             padding: 30px;
             margin-top: 30px;
-        }}
+        }
 
-        .insight-item {{
+        .insight-item {
             background: white;
             border-radius: 10px;
             padding: 20px;
             margin-bottom: 15px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }}
+        }
 
-        .insight-title {{
+        .insight-title {
             font-size: 1.2em;
             font-weight: bold;
             color: #e74c3c;
             margin-bottom: 10px;
-        }}
+        }
 
-        .insight-content {{
+        .insight-content {
             color: #555;
             line-height: 1.8;
-        }}
+        }
 
-        .footer {{
+        .footer {
             text-align: center;
             padding: 30px;
             background: #f8f9fa;
             color: #666;
             font-size: 0.9em;
-        }}
+        }
 
-        .offline-badge {{
+        .offline-badge {
             background: #2ecc71;
             color: white;
             padding: 5px 12px;
             border-radius: 15px;
             font-size: 0.85em;
             font-weight: bold;
-        }}
-
-        @media (max-width: 768px) {{
-            .content {{ padding: 20px; }}
-            .metrics-grid {{ grid-template-columns: 1fr; }}
-            header h1 {{ font-size: 1.8em; }}
-        }}
-    </style>
+        }
+
+        @media (max-width: 768px) {
+            .content { padding: 20px; }
+            .metrics-grid { grid-template-columns: 1fr; }
+            header h1 { font-size: 1.8em; }
+        }
+"""
+
+# 页面骨架在模块导入时构建一次；带数据的段落用string.Template，
+# substitute只是一次预编译正则的替换
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>📊 模块转化效能深度分析报告（完全离线版）</title>
+    <link rel="stylesheet" href="report_style.css">
 </head>
 <body>
     <div class="container">
-        <header>
+"""
+
+_HEADER_TPL = string.Template("""        <header>
             <h1>📊 模块转化效能深度分析报告</h1>
-            <p>数据驱动的业务洞察 | 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+            <p>数据驱动的业务洞察 | 生成时间: $now</p>
             <div class="badge">
                 <span class="offline-badge">🔒 完全离线 · 数据本地化</span>
             </div>
-            <p style="margin-top: 10px; font-size: 0.95em;">数据来源: {Path(data_file).name} | 分析记录: {len(df):,} 条</p>
+            <p style="margin-top: 10px; font-size: 0.95em;">数据来源: $data_name | 分析记录: $row_count 条</p>
         </header>
 
         <div class="content">
@@ -424,22 +385,22 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
             <div class="metrics-grid">
                 <div class="metric-card">
                     <div class="metric-label">点击率 CTR</div>
-                    <div class="metric-value">{ctr}%</div>
-                    <div class="metric-subtitle">总曝光 {total_exposure:,}</div>
+                    <div class="metric-value">$ctr%</div>
+                    <div class="metric-subtitle">总曝光 $total_exposure</div>
                 </div>
                 <div class="metric-card">
                     <div class="metric-label">点击转化率</div>
-                    <div class="metric-value">{click_cvr}%</div>
-                    <div class="metric-subtitle">总点击 {total_click:,}</div>
+                    <div class="metric-value">$click_cvr%</div>
+                    <div class="metric-subtitle">总点击 $total_click</div>
                 </div>
                 <div class="metric-card">
                     <div class="metric-label">下单转化率</div>
-                    <div class="metric-value">{order_cvr}%</div>
-                    <div class="metric-subtitle">总下单 {total_order:,}</div>
+                    <div class="metric-value">$order_cvr%</div>
+                    <div class="metric-subtitle">总下单 $total_order</div>
                 </div>
                 <div class="metric-card">
                     <div class="metric-label">分析周期</div>
-                    <div class="metric-value">{len(date_analysis)}</div>
+                    <div class="metric-value">$days</div>
                     <div class="metric-subtitle">天数</div>
                 </div>
             </div>
@@ -462,29 +423,9 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
                             <span>下单转化率</span>
                         </div>
                     </div>
-                    <div class="trend-grid">
-"""
+                    <div class="trend-grid">""")
 
-    # 添加趋势数据点
-    max_val = max(trend_data['ctr'].max(), trend_data['click_cvr'].max(), trend_data['order_cvr'].max())
-    for _, row in trend_data.iterrows():
-        date_str = row['日期'].strftime('%m-%d')
-        ctr_height = (row['ctr'] / max_val * 100) if max_val > 0 else 0
-        cvr_height = (row['click_cvr'] / max_val * 100) if max_val > 0 else 0
-        order_height = (row['order_cvr'] / max_val * 100) if max_val > 0 else 0
-
-        html_content += f"""
-                        <div class="trend-point">
-                            <div class="trend-bars">
-                                <div class="trend-bar" style="background: #667eea; height: {ctr_height}%;" title="CTR: {row['ctr']}%"></div>
-                                <div class="trend-bar" style="background: #f7931a; height: {cvr_height}%;" title="点击CVR: {row['click_cvr']}%"></div>
-                                <div class="trend-bar" style="background: #2ed573; height: {order_height}%;" title="下单CVR: {row['order_cvr']}%"></div>
-                            </div>
-                            <div class="trend-date">{date_str}</div>
-                        </div>
-"""
-
-    html_content += """
+_TOP10_OPEN = """
                     </div>
                 </div>
             </div>
@@ -492,40 +433,9 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
             <!-- Top 10 对比图 -->
             <div class="section">
                 <h2 class="section-title">🏆 Top 10 模块效能对比</h2>
-                <div class="bar-chart">
-"""
-
-    # 添加Top 10条形图
-    top10 = top_modules.head(10)
-    max_ctr = top10['点击率(CTR)'].max()
+                <div class="bar-chart">"""
 
-    for _, row in top10.iterrows():
-        name = row['点击事件名称']
-        if len(name) > 20:
-            name = name[:20] + '...'
-
-        width_ctr = (row['点击率(CTR)'] / max_ctr * 100) if max_ctr > 0 else 0
-        width_cvr = (row['点击转化率'] / max_ctr * 100) if max_ctr > 0 else 0
-        width_order = (row['下单转化率'] / max_ctr * 100) if max_ctr > 0 else 0
-
-        html_content += f"""
-                    <div class="bar-item">
-                        <div class="bar-label">
-                            <span><strong>{name}</strong></span>
-                        </div>
-                        <div class="bar-wrapper">
-                            <div class="bar-fill ctr" style="width: {width_ctr}%;">{row['点击率(CTR)']}%</div>
-                        </div>
-                        <div class="bar-wrapper" style="height: 20px; margin-top: 3px;">
-                            <div class="bar-fill cvr" style="width: {width_cvr}%; font-size: 0.75em;">{row['点击转化率']}%</div>
-                        </div>
-                        <div class="bar-wrapper" style="height: 20px; margin-top: 3px;">
-                            <div class="bar-fill order" style="width: {width_order}%; font-size: 0.75em;">{row['下单转化率']}%</div>
-                        </div>
-                    </div>
-"""
-
-    html_content += """
+_TABLE_OPEN = """
                 </div>
             </div>
 
@@ -545,66 +455,9 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
                                 <th style="text-align: right;">下单转化率</th>
                             </tr>
                         </thead>
-                        <tbody>
-"""
-
-    # 添加表格行
-    for idx, row in top_modules.iterrows():
-        rank = idx + 1
-        rank_class = 'top3' if rank <= 3 else ''
-
-        ctr_val = row['点击率(CTR)']
-        if ctr_val >= 50:
-            badge_class = 'badge-success'
-        elif ctr_val >= 20:
-            badge_class = 'badge-info'
-        else:
-            badge_class = 'badge-warning'
-
-        html_content += f"""
-                            <tr>
-                                <td style="text-align: center;"><span class="rank {rank_class}">{rank}</span></td>
-                                <td><strong>{row['点击事件名称']}</strong></td>
-                                <td style="text-align: right;">{row['曝光人数']:,}</td>
-                                <td style="text-align: right;">{row['点击人数']:,}</td>
-                                <td style="text-align: right;"><span class="badge-pill {badge_class}">{row['点击率(CTR)']}%</span></td>
-                                <td style="text-align: right;">{row['点击转化率']}%</td>
-                                <td style="text-align: right;">{row['下单转化率']}%</td>
-                            </tr>
-"""
-
-    # 业务洞察
-    click_loss = 100 - ctr
-    convert_loss = 100 - click_cvr
-    order_loss = 100 - order_cvr
-    max_loss = max(click_loss, convert_loss, order_loss)
-
-    if max_loss == click_loss:
-        max_loss_stage = "曝光到点击"
-        suggestions = [
-            "优化模块视觉设计，提升吸引力",
-            "调整模块位置，增加曝光质量",
-            "A/B测试不同的文案和图片",
-            "增强CTA按钮的视觉突出度"
-        ]
-    elif max_loss == convert_loss:
-        max_loss_stage = "点击到转化"
-        suggestions = [
-            "优化填写页体验，简化流程",
-            "检查页面加载速度",
-            "增加信任背书和优惠提示",
-            "优化表单填写体验"
-        ]
-    else:
-        max_loss_stage = "转化到下单"
-        suggestions = [
-            "优化支付流程，减少支付摩擦",
-            "检查价格策略和优惠券使用",
-            "增加订单确认页的信息透明度",
-            "提供多种支付方式选择"
-        ]
+                        <tbody>"""
 
-    html_content += f"""
+_INSIGHTS_TPL = string.Template("""
                         </tbody>
                     </table>
                 </div>
@@ -617,11 +470,11 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
                 <div class="insight-item">
                     <div class="insight-title">🔍 漏斗流失分析</div>
                     <div class="insight-content">
-                        <p><strong>最大流失环节:</strong> {max_loss_stage} (流失率 {max_loss:.2f}%)</p>
+                        <p><strong>最大流失环节:</strong> $max_loss_stage (流失率 $max_loss%)</p>
                         <ul style="margin-top: 10px; padding-left: 20px;">
-                            <li>曝光到点击: {click_loss:.2f}% 用户未点击</li>
-                            <li>点击到转化: {convert_loss:.2f}% 用户点击后未提交订单</li>
-                            <li>转化到下单: {order_loss:.2f}% 用户提交后未完成预订</li>
+                            <li>曝光到点击: $click_loss% 用户未点击</li>
+                            <li>点击到转化: $convert_loss% 用户点击后未提交订单</li>
+                            <li>转化到下单: $order_loss% 用户提交后未完成预订</li>
                         </ul>
                     </div>
                 </div>
@@ -629,9 +482,9 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
                 <div class="insight-item">
                     <div class="insight-title">🎯 优化建议</div>
                     <div class="insight-content">
-                        <p><strong>针对 {max_loss_stage} 环节:</strong></p>
+                        <p><strong>针对 $max_loss_stage 环节:</strong></p>
                         <ul style="margin-top: 10px; padding-left: 20px;">
-                            {"".join([f"<li>{s}</li>" for s in suggestions])}
+                            $suggestions_html
                         </ul>
                     </div>
                 </div>
@@ -640,15 +493,9 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
                     <div class="insight-title">🏆 高价值模块推荐</div>
                     <div class="insight-content">
                         <p>以下模块点击率最高，建议重点推广:</p>
-                        <ul style="margin-top: 10px; padding-left: 20px;">
-"""
+                        <ul style="margin-top: 10px; padding-left: 20px;">""")
 
-    for _, row in top_modules.head(5).iterrows():
-        html_content += f"""
-                            <li><strong>{row['点击事件名称']}</strong>: CTR {row['点击率(CTR)']}%, 下单CVR {row['下单转化率']}%</li>
-"""
-
-    html_content += f"""
+_FOOTER_TPL = string.Template("""
                         </ul>
                     </div>
                 </div>
@@ -657,31 +504,306 @@ def generate_offline_html_report(data_file, output_file=None, min_click_threshol
 
         <div class="footer">
             <p>🤖 本报告由数据分析工具自动生成 | <span class="offline-badge">🔒 100% 本地运行 · 无云端依赖</span></p>
-            <p style="margin-top: 10px;">数据清洗规则: 剔除点击量 &lt; {min_click_threshold} 的长尾数据 | 剔除点击 &gt; 曝光的异常数据</p>
+            <p style="margin-top: 10px;">数据清洗规则: 剔除点击量 &lt; $min_click_threshold 的长尾数据 | 剔除点击 &gt; 曝光的异常数据</p>
             <p style="margin-top: 5px; font-size: 0.85em; color: #999;">所有数据均在本地处理，未上传任何服务器</p>
         </div>
     </div>
 </body>
-</html>
-"""
+</html>""")
+
 
-    # 写入文件
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+def generate_offline_html_report(data_file, output_file=None, min_click_threshold=10,
+                                 gzip_output=False):
+    """
+    生成完全离线的HTML报告（无任何外部依赖）
+
+    Args:
+        data_file: 数据文件路径
+        output_file: 输出HTML文件路径
+        min_click_threshold: 最小点击量阈值
+        gzip_output: 为True时输出gzip压缩的 .html.gz 文件
+    """
+    # 转换为字符串处理
+    data_file = str(data_file)
+
+    # 加载数据。旁路.parquet做解析缓存：首次分析后把结果转存成列式
+    # 格式，之后重复分析同一文件（交互工具里很常见）跳过Excel/CSV解析，
+    # 直接毫秒级读回；缓存比原文件旧时自动失效重建。缓存名保留原
+    # 扩展名（data.xlsx -> data.xlsx.parquet），同目录的data.xlsx和
+    # data.csv才不会共用一份缓存互相串数据
+    print(f"正在加载数据: {data_file}")
+    src_path = Path(data_file)
+    cache_path = src_path.with_name(src_path.name + '.parquet')
+    write_cache = False
+    if data_file.endswith('.parquet'):
+        df = pd.read_parquet(data_file, columns=NEEDED_COLS)
+    elif cache_path.exists() and cache_path.stat().st_mtime >= src_path.stat().st_mtime:
+        df = pd.read_parquet(cache_path, columns=NEEDED_COLS)
+    elif data_file.endswith('.xlsx') or data_file.endswith('.xls'):
+        # calamine是Rust写的Excel解析器（pandas>=2.2），大文件比openpyxl
+        # 快一个数量级；环境里没有就退回默认引擎
+        try:
+            df = pd.read_excel(data_file, engine='calamine', usecols=NEEDED_COLS)
+        except (ImportError, ValueError):
+            df = pd.read_excel(data_file, usecols=NEEDED_COLS)
+        write_cache = True
+    elif data_file.endswith('.csv'):
+        # pyarrow引擎多线程分块解析CSV，退回单线程C解析器
+        try:
+            df = pd.read_csv(data_file, engine='pyarrow', usecols=NEEDED_COLS)
+        except (ImportError, ValueError):
+            df = pd.read_csv(data_file, usecols=NEEDED_COLS)
+        write_cache = True
+    else:
+        raise ValueError("不支持的文件格式")
+
+    if write_cache:
+        try:
+            df.to_parquet(cache_path, compression='zstd')
+        except Exception as e:
+            print(f"警告: 写入parquet缓存失败: {e}")
+
+    # 高重复的事件名转categorical：每个名字只存一份字符串，后面的
+    # groupby直接用整数码当键，不再逐行哈希完整字符串。基数太高时
+    # categorical不划算，退而转pyarrow字符串——全部字符串放进一段连续
+    # 缓冲，比每行一个Python str对象省数倍内存，哈希也更快
+    if df['点击事件名称'].dtype != 'category':
+        col = df['点击事件名称']
+        if col.nunique() <= len(col) // 2:
+            df['点击事件名称'] = col.astype('category')
+        else:
+            try:
+                df['点击事件名称'] = col.astype('string[pyarrow]')
+            except ImportError:
+                pass
+
+    # 日期在加载阶段一次性解析完。Excel/parquet读出来往往已是
+    # datetime64，直接跳过；字符串列指明ISO格式走C解析器，
+    # cache=True让重复出现的日期串只解析一次
+    if not pd.api.types.is_datetime64_any_dtype(df['日期']):
+        df['日期'] = pd.to_datetime(df['日期'], format='ISO8601', cache=True,
+                                  errors='coerce')
+
+    # 数据清洗：两个条件合成一个布尔掩码、一次切片，
+    # 不再让中间结果整帧拷贝一遍
+    original_count = len(df)
+    clk = df['点击UV(SUM)'].to_numpy()
+    imp = df['页面UV(SUM)'].to_numpy()
+    df = df[(clk >= min_click_threshold) & (clk <= imp)]
+    print(f"数据清洗: {original_count} -> {len(df)} 条记录")
+
+    # 按点击事件分组分析：结果马上要按CTR重排，sort=False省掉对分组键
+    # 的排序；observed=True不为被清洗掉的category值补全零行
+    event_analysis = df.groupby('点击事件名称', sort=False, observed=True).agg({
+        '页面UV(SUM)': 'sum',
+        '点击UV(SUM)': 'sum',
+        '点击用户提交单(SUM)': 'sum',
+        '点击用户预订单(SUM)': 'sum'
+    }).reset_index()
+
+    event_analysis.columns = ['点击事件名称', '曝光人数', '点击人数', '转化人数', '下单人数']
+
+    # 整体指标把每事件的小计再求和拿到：四次O(事件数)的归约，
+    # 不再为四个总数各扫一遍整个df
+    total_exposure, total_click, total_convert, total_order = (
+        event_analysis[['曝光人数', '点击人数', '转化人数', '下单人数']].sum())
+
+    ctr = round((total_click / total_exposure * 100) if total_exposure > 0 else 0, 2)
+    click_cvr = round((total_convert / total_click * 100) if total_click > 0 else 0, 2)
+    order_cvr = round((total_order / total_click * 100) if total_click > 0 else 0, 2)
+
+    # 三个比率列并成一次2D运算：除法和×100在同一趟里完成，分母为0的
+    # 行直接落0。不再round出一份新数组——小数位留到写HTML时用:.2f格式化
+    num = event_analysis[['点击人数', '转化人数', '下单人数']].to_numpy(dtype='f8')
+    den = event_analysis[['曝光人数', '点击人数', '点击人数']].to_numpy(dtype='f8')
+    rates = np.divide(num, den, out=np.zeros_like(num), where=den != 0) * 100
+    event_analysis[['点击率(CTR)', '点击转化率', '下单转化率']] = rates
+
+    # 获取Top 50：只要前50行就不值得对全部事件做完整排序，
+    # nlargest走堆上的部分排序，O(N log 50)
+    top_modules = event_analysis.nlargest(50, '点击率(CTR)').reset_index(drop=True)
+
+    # 日期趋势分析：一次C级的分组求和，三个比率在求和结果上整列算出，
+    # 去掉了按天回调Python、逐组构造Series的apply慢路径
+    g = df.groupby('日期', sort=True)[
+        ['页面UV(SUM)', '点击UV(SUM)', '点击用户提交单(SUM)', '点击用户预订单(SUM)']].sum()
+    date_analysis = pd.DataFrame({
+        'ctr': g['点击UV(SUM)'] / g['页面UV(SUM)'] * 100,
+        'click_cvr': g['点击用户提交单(SUM)'] / g['点击UV(SUM)'] * 100,
+        'order_cvr': g['点击用户预订单(SUM)'] / g['点击UV(SUM)'] * 100,
+    }).reset_index()
+
+    # 准备趋势数据（最近15天）
+    trend_data = date_analysis.tail(15)
+
+    # 生成HTML
+    if output_file is None:
+        output_file = f"funnel_analysis_offline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+
+    # 每份报告不再各带约8KB一模一样的内联CSS；样式写成输出目录下
+    # 共享的report_style.css，缺失时补一份
+    css_path = Path(output_file).resolve().parent / 'report_style.css'
+    if not css_path.exists():
+        try:
+            css_path.write_text(_REPORT_CSS, encoding='utf-8')
+        except OSError as e:
+            print(f"警告: 写入样式表失败: {e}")
+
+    # 边生成边写盘：+=每拼接一次都要把已生成的整页复制一遍，
+    # 表格行数一多就是O(N²)；改为经1MB缓冲的文件句柄逐段write。
+    # 报告大头是重复的表格标记，压缩率极高：level=1的体积已接近
+    # level=6，CPU开销却小得多，落盘字节数缩到约1/10
+    if gzip_output:
+        output_file = f"{output_file}.gz"
+        f = gzip.open(output_file, 'wt', encoding='utf-8', compresslevel=1)
+    else:
+        f = open(output_file, 'w', encoding='utf-8', buffering=1 << 20)
+    w = f.write
+    w(_HTML_HEAD)
+    w(_HEADER_TPL.substitute(
+        now=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        data_name=Path(data_file).name,
+        row_count=f'{len(df):,}',
+        ctr=ctr, total_exposure=f'{total_exposure:,}',
+        click_cvr=click_cvr, total_click=f'{total_click:,}',
+        order_cvr=order_cvr, total_order=f'{total_order:,}',
+        days=len(date_analysis)))
+
+    # 添加趋势数据点：日期字符串一次dt.strftime算完，柱高一次矩阵乘；
+    # 循环改走itertuples的普通元组，iterrows逐行构造Series的开销消失
+    max_val = max(trend_data['ctr'].max(), trend_data['click_cvr'].max(), trend_data['order_cvr'].max())
+    tscale = 100 / max_val if max_val > 0 else 0
+    trend_rates = trend_data[['ctr', 'click_cvr', 'order_cvr']]
+    trend_dates = trend_data['日期'].dt.strftime('%m-%d').to_numpy()
+    trend_heights = trend_rates.to_numpy() * tscale
+
+    for date_str, (ctr_height, cvr_height, order_height), (ctr_v, cvr_v, order_v) in zip(
+            trend_dates, trend_heights,
+            trend_rates.itertuples(index=False, name=None)):
+        w(_TREND_TPL % (ctr_height, ctr_v, cvr_height, cvr_v,
+                        order_height, order_v, date_str))
+
+    w(_TOP10_OPEN)
+
+    # 添加Top 10条形图：条宽矩阵和名称截断先整列向量化算好，
+    # 循环里只剩现成值的字符串插值，没有逐行的除法和分支
+    top10 = top_modules.head(10)
+    max_ctr = top10['点击率(CTR)'].max()
+    scale = 100 / max_ctr if max_ctr > 0 else 0
+    rate_cols = top10[['点击率(CTR)', '点击转化率', '下单转化率']]
+    widths10 = rate_cols.to_numpy() * scale
+    names10 = top10['点击事件名称'].astype(str)
+    names10 = (names10.str.slice(0, 20)
+               + np.where(names10.str.len() > 20, '...', '')).tolist()
+
+    for name, (width_ctr, width_cvr, width_order), (ctr_v, cvr_v, order_v) in zip(
+            names10, widths10, rate_cols.itertuples(index=False, name=None)):
+        w(f"""
+                    <div class="bar-item">
+                        <div class="bar-label">
+                            <span><strong>{name}</strong></span>
+                        </div>
+                        <div class="bar-wrapper">
+                            <div class="bar-fill ctr" style="width: {width_ctr:.2f}%;">{ctr_v:.2f}%</div>
+                        </div>
+                        <div class="bar-wrapper" style="height: 20px; margin-top: 3px;">
+                            <div class="bar-fill cvr" style="width: {width_cvr:.2f}%; font-size: 0.75em;">{cvr_v:.2f}%</div>
+                        </div>
+                        <div class="bar-wrapper" style="height: 20px; margin-top: 3px;">
+                            <div class="bar-fill order" style="width: {width_order:.2f}%; font-size: 0.75em;">{order_v:.2f}%</div>
+                        </div>
+                    </div>
+""")
+
+    w(_TABLE_OPEN)
+
+    # 添加表格行：徽章和排名样式整列一次算出，行循环按普通元组走；
+    # 排名用enumerate现算，顺带修掉此前拿残留原始索引当排名的问题
+    badges = _BADGE_CLS[np.digitize(top_modules['点击率(CTR)'].to_numpy(),
+                                    _BADGE_BINS)]
+    rank_cls = np.where(np.arange(len(top_modules)) < 3, 'top3', '')
+
+    for rank, (badge_class, rank_class,
+               (name, exposure, clicks, _cv, _od, ctr_val, cvr_val, order_val)) in enumerate(
+            zip(badges, rank_cls,
+                top_modules.itertuples(index=False, name=None)), 1):
+        w(f"""
+                            <tr>
+                                <td style="text-align: center;"><span class="rank {rank_class}">{rank}</span></td>
+                                <td><strong>{name}</strong></td>
+                                <td style="text-align: right;">{exposure:,}</td>
+                                <td style="text-align: right;">{clicks:,}</td>
+                                <td style="text-align: right;"><span class="badge-pill {badge_class}">{ctr_val:.2f}%</span></td>
+                                <td style="text-align: right;">{cvr_val:.2f}%</td>
+                                <td style="text-align: right;">{order_val:.2f}%</td>
+                            </tr>
+""")
+
+    # 业务洞察
+    click_loss = 100 - ctr
+    convert_loss = 100 - click_cvr
+    order_loss = 100 - order_cvr
+    max_loss = max(click_loss, convert_loss, order_loss)
+
+    if max_loss == click_loss:
+        max_loss_stage = "曝光到点击"
+        suggestions = [
+            "优化模块视觉设计，提升吸引力",
+            "调整模块位置，增加曝光质量",
+            "A/B测试不同的文案和图片",
+            "增强CTA按钮的视觉突出度"
+        ]
+    elif max_loss == convert_loss:
+        max_loss_stage = "点击到转化"
+        suggestions = [
+            "优化填写页体验，简化流程",
+            "检查页面加载速度",
+            "增加信任背书和优惠提示",
+            "优化表单填写体验"
+        ]
+    else:
+        max_loss_stage = "转化到下单"
+        suggestions = [
+            "优化支付流程，减少支付摩擦",
+            "检查价格策略和优惠券使用",
+            "增加订单确认页的信息透明度",
+            "提供多种支付方式选择"
+        ]
+
+    w(_INSIGHTS_TPL.substitute(
+        max_loss_stage=max_loss_stage,
+        max_loss=f'{max_loss:.2f}', click_loss=f'{click_loss:.2f}',
+        convert_loss=f'{convert_loss:.2f}', order_loss=f'{order_loss:.2f}',
+        suggestions_html=''.join(f'<li>{s}</li>' for s in suggestions)))
+
+    for name, ctr_val, order_val in top_modules[
+            ['点击事件名称', '点击率(CTR)', '下单转化率']].head(5).itertuples(
+            index=False, name=None):
+        w(f"""
+                            <li><strong>{name}</strong>: CTR {ctr_val:.2f}%, 下单CVR {order_val:.2f}%</li>
+""")
+
+    w(_FOOTER_TPL.substitute(min_click_threshold=min_click_threshold))
+
+    f.close()
 
     print(f"\n✓ 完全离线的HTML报告已生成: {output_file}")
     print(f"✓ 无任何外部依赖，可在无网络环境下打开")
-    return output_file
+    # 顺带返回数据规模，调用方不必为拿行列数重新解析一遍文件
+    return {'output_file': output_file, 'rows': original_count, 'columns': len(df.columns)}
 
 
 if __name__ == '__main__':
     import sys
 
-    if len(sys.argv) < 2:
-        print("用法: python generate_offline_report.py <数据文件路径> [输出文件路径]")
+    use_gzip = '--gzip' in sys.argv[1:]
+    args = [a for a in sys.argv[1:] if a != '--gzip']
+
+    if not args:
+        print("用法: python generate_offline_report.py <数据文件路径> [输出文件路径] [--gzip]")
         sys.exit(1)
 
-    data_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    data_file = args[0]
+    output_file = args[1] if len(args) > 1 else None
 
-    generate_offline_html_report(data_file, output_file)
+    generate_offline_html_report(data_file, output_file, gzip_output=use_gzip)
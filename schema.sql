@@ -10,11 +10,13 @@ CREATE TABLE uploads (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- 分析报告表
+-- 分析报告表（报告HTML以zstd压缩存入 report_data，report_html 仅兼容旧行）
 CREATE TABLE reports (
     id SERIAL PRIMARY KEY,
     upload_id INTEGER REFERENCES uploads(id) ON DELETE CASCADE,
-    report_html TEXT NOT NULL,
+    report_html TEXT,
+    report_data BYTEA,
+    report_encoding VARCHAR(8) DEFAULT 'plain',
     data_info JSONB,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -23,3 +25,6 @@ CREATE TABLE reports (
 CREATE INDEX idx_uploads_created_at ON uploads(created_at DESC);
 CREATE INDEX idx_reports_created_at ON reports(created_at DESC);
 CREATE INDEX idx_reports_upload_id ON reports(upload_id);
+
+-- 覆盖索引：报告列表 JOIN 只需 filename/file_size，避免回表读大 BYTEA 行
+CREATE INDEX idx_uploads_id_filename ON uploads(id) INCLUDE (filename, file_size);
@@ -5,6 +5,7 @@
 直接在命令行中选择文件并分析
 """
 
+import heapq
 import os
 import sys
 from pathlib import Path
@@ -24,17 +25,23 @@ def list_files():
         Path.home() / "Desktop"
     ]
 
-    files = []
+    # 原来的 glob + **递归 对每个目录扫两遍，还会钻进家目录的整个
+    # 子树，动辄几千次stat；改成os.scandir只扫一层，DirEntry直接带回
+    # 读目录时缓存的stat，每个条目只付一次系统调用
+    exts = ('.xlsx', '.xls', '.csv')
+    seen = {}
     for search_path in search_paths:
-        if search_path.exists():
-            for ext in ['*.xlsx', '*.xls', '*.csv']:
-                files.extend(search_path.glob(ext))
-                files.extend(search_path.glob(f'**/{ext}'))
+        if not search_path.exists():
+            continue
+        with os.scandir(search_path) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(exts):
+                    seen[entry.path] = entry.stat().st_mtime
 
-    # 去重并按修改时间排序
-    files = sorted(set(files), key=lambda x: x.stat().st_mtime, reverse=True)
-
-    return files[:20]  # 只显示最近的20个文件
+    # 只要最近的20个，堆上的部分选择O(n log 20)即可，
+    # 不用为此对全部候选做一次完整排序
+    newest = heapq.nlargest(20, seen.items(), key=lambda kv: kv[1])
+    return [Path(p) for p, _ in newest]
 
 
 def main():
@@ -120,7 +127,14 @@ def analyze_file(file_path):
         open_report = input("\n是否立即打开报告？(y/n): ").strip().lower()
         if open_report == 'y':
             import subprocess
-            subprocess.run(['open', output_file])
+            # 按平台选打开命令（'open'只有macOS有），并用Popen非阻塞
+            # 启动，不再等系统默认程序退出才回到交互循环
+            if sys.platform == 'darwin':
+                subprocess.Popen(['open', output_file])
+            elif os.name == 'nt':
+                os.startfile(output_file)
+            else:
+                subprocess.Popen(['xdg-open', output_file])
             print("\n✅ 已在浏览器中打开报告")
 
         print("\n" + "="*70)